@@ -3,27 +3,68 @@ import random
 from pathfinder import a_star_search
 
 class Agent:
-    def __init__(self, agent_id, start_pos):
+    def __init__(self, agent_id, start_pos, rng=random, planner=a_star_search):
         self.id = agent_id
+        # Each env hands its own RNG to its agents so a shift can be replayed
+        self.rng = rng
+        # Any function with the a_star_search signature (see pathfinder.PLANNERS)
+        self.planner = planner
+        # BATCHED PLANNING: When the env hands us a shared list, searches are
+        # queued there as (agent, kind, obstacle) and solved together by the env
+        self.plan_queue = None
+        # CONGESTION ROUTING: The env's live traffic costs (array indexed [x, y]),
+        # shared by all agents and handed to every search. None = plain A*.
+        self.cell_costs = None
         self.pos = start_pos
         self.target = None
+        # MULTI-PICK TRIPS: pallets still to visit after the current target, in tour order
+        self.pick_list = []
         self.path = []
         self.state = "IDLE" 
         self.color = (255, 50, 50)
         
         # --- TRUE MAS ATTRIBUTES ---
-        self.max_patience = random.randint(5, 20) 
+        self.max_patience = self.rng.randint(5, 20) 
         self.patience = self.max_patience
         self.stuck_count = 0       # "Planning": Tracks if I'm totally deadlocked
         
         self.timer = 0
         self.task_complete = False
+        self.replan_count = 0      # Telemetry: searches caused by traffic / lost paths
+
+    def get_state(self):
+        """
+        CHECKPOINT: Everything that changes during a shift, as plain data.
+        """
+        return (
+            self.pos, self.target, list(self.path), self.state, self.color,
+            self.max_patience, self.patience, self.stuck_count,
+            self.timer, self.task_complete, self.replan_count, list(self.pick_list)
+        )
+
+    def set_state(self, state):
+        (self.pos, self.target, path, self.state, self.color,
+         self.max_patience, self.patience, self.stuck_count,
+         self.timer, self.task_complete, self.replan_count, pick_list) = state
+        self.path = list(path)
+        self.pick_list = list(pick_list)
 
     def set_target(self, target_pos, allowed_moves):
         self.target = target_pos
+        if self.plan_queue is not None:
+            self.plan_queue.append((self, "target", None))
+            return
+
         # --- SEARCHING ---
-        path = a_star_search(self.pos, self.target, allowed_moves)
-        
+        path = self._search(allowed_moves)
+        self._take_target_path(path)
+
+    def _search(self, allowed_moves, obstacles=None):
+        if self.cell_costs is None:
+            return self.planner(self.pos, self.target, allowed_moves, obstacles)
+        return self.planner(self.pos, self.target, allowed_moves, obstacles, cell_costs=self.cell_costs)
+
+    def _take_target_path(self, path):
         if path:
             self.path = path
             self.state = "MOVE"
@@ -70,7 +111,8 @@ class Agent:
                 # ----------------------------------------------------------
 
                 # We are lost (maybe just yielded?) -> Re-calculate path to target
-                path = a_star_search(self.pos, self.target, allowed_moves)
+                self.replan_count += 1
+                path = self._search(allowed_moves)
                 if path:
                     self.path = path
                     self.state = "MOVE"
@@ -89,6 +131,11 @@ class Agent:
                 if other.id != self.id and other.pos == next_pos:
                     blocker = other
                     break
+
+        # Stepping off a dock into the agent that waits for our slot: a
+        # handover, the env lets us swap (see WarehouseEnv._resolve_moves)
+        if blocker and self.pos in shed_tiles and blocker.next_step() == self.pos:
+            blocker = None
         
         # 2. REASONING: Conflict Resolution
         if blocker:
@@ -110,35 +157,91 @@ class Agent:
                     return self.pos
                 else:
                     # STEP 1: PLAN (Try to go around)
-                    success = self.force_replan(allowed_moves, obstacle=next_pos)
+                    success = self.force_replan(allowed_moves, obstacle=next_pos, yield_on_fail=True)
                     
-                    if not success:
+                    if success is False:
                         # STEP 2: YIELD (Planning failed? I must move aside.)
                         self.yield_position(allowed_moves, other_agents, shed_tiles)
                     
                     return self.pos
 
-        # 3. EXECUTION
-        self.max_patience = random.randint(5, 20) 
-        self.patience = self.max_patience 
+        # 3. EXECUTION (the env may still refuse it, see reject_move)
         self.state = "MOVE"
         
         # We already popped self.pos at the top, so just return next_pos
         return next_pos
 
-    def force_replan(self, allowed_moves, obstacle):
+    def pending_move(self, occupants, shed_tiles):
+        """
+        EVENT-DRIVEN: What negotiate_move() would do next tick, without doing it.
+        Returns ("move", next_pos) if it would ask for a step, ("queue", None)
+        if it would wait behind a blocker with the same target, ("patience",
+        None) if it would spend one patience (Case C), and (None, None) if it
+        would load, plan, yield or go idle.
+        'occupants' maps tile -> agent (only dock tiles are ever shared, and
+        those never block).
+        """
+        i = 0
+        while i < len(self.path) and self.path[i] == self.pos:
+            i += 1
+        if i == len(self.path):
+            return None, None
+        next_pos = self.path[i]
+
+        blocker = None if next_pos in shed_tiles else occupants.get(next_pos)
+        if blocker is None or blocker is self:
+            return "move", next_pos
+        if self.pos in shed_tiles and blocker.next_step() == self.pos:
+            return "move", next_pos # Dock handover
+        if blocker.state == "LOADING":
+            return None, None
+        if blocker.target == self.target:
+            return "queue", None
+        if self.patience > 0:
+            return "patience", None
+        return None, None
+
+    def move_to(self, next_pos):
+        """The env granted our move: take the step and calm down again."""
+        self.pos = next_pos
+        self.max_patience = self.rng.randint(5, 20) 
+        self.patience = self.max_patience 
+
+    def reject_move(self, next_pos, allowed_moves, other_agents, shed_tiles):
+        """
+        The env refused our move (another agent got the tile or its sector,
+        or the agent ahead could not leave). Treated like Case C traffic:
+        wait while patience lasts, then go around or step aside.
+        """
+        if self.patience > 0:
+            self.patience -= 1
+            self.state = "WAIT"
+            return
+        success = self.force_replan(allowed_moves, obstacle=next_pos, yield_on_fail=True)
+        if success is False:
+            self.yield_position(allowed_moves, other_agents, shed_tiles)
+
+    def force_replan(self, allowed_moves, obstacle, yield_on_fail=False):
         """
         PLANNING: The agent actively creates a new plan 
         treating the blockage as a permanent wall.
-        Returns: True if successful, False if no path found.
+        Returns: True if successful, False if no path found,
+        None if the search was queued for the env's batch (we WAIT meanwhile).
         """
-        new_path = a_star_search(
-            self.pos, 
-            self.target, 
+        self.replan_count += 1
+        if self.plan_queue is not None:
+            kind = "replan_or_yield" if yield_on_fail else "replan"
+            self.plan_queue.append((self, kind, obstacle))
+            self.state = "WAIT"
+            return None
+
+        new_path = self._search(
             allowed_moves, 
             obstacles={obstacle} # Treat the person as a wall
         )
-        
+        return self._take_replan_path(new_path)
+
+    def _take_replan_path(self, new_path):
         if new_path:
             self.path = new_path
             self.patience = self.max_patience # Reset patience
@@ -148,6 +251,40 @@ class Agent:
             self.state = "WAIT"
             return False
 
+    def next_step(self):
+        """The next tile on our path that is not where we stand (None if none)."""
+        for tile in self.path:
+            if tile != self.pos:
+                return tile
+        return None
+
+    def is_lost(self):
+        """
+        True if we still have a target but no path left to it
+        (e.g. right after yielding). negotiate_move() would re-plan.
+        """
+        while self.path and self.path[0] == self.pos:
+            self.path.pop(0)
+        return not self.path and self.target is not None and self.pos != self.target
+
+    def apply_plan(self, kind, path, allowed_moves, other_agents, shed_tiles):
+        """
+        BATCHED PLANNING: Finish a queued search once the env has solved it.
+        """
+        if kind == "target":
+            self._take_target_path(path)
+        elif kind == "resume":
+            self.replan_count += 1
+            if path:
+                self.path = path
+                self.state = "MOVE"
+            else:
+                self.state = "IDLE"
+        else:
+            success = self._take_replan_path(path)
+            if not success and kind == "replan_or_yield":
+                self.yield_position(allowed_moves, other_agents, shed_tiles)
+
     def yield_position(self, allowed_moves, other_agents, shed_tiles):
         """
         FALLBACK REASONING: 
@@ -173,7 +310,7 @@ class Agent:
             
         if candidates:
             # Pick a random spot to step aside
-            random.shuffle(candidates)
+            self.rng.shuffle(candidates)
             yield_tile = candidates[0]
             
             # Overwrite path to just go there. 
@@ -0,0 +1,153 @@
+# async_runner.py
+import argparse
+import asyncio
+import functools
+
+import pygame
+
+from warehouse_env import WarehouseEnv
+
+class AsyncRunner:
+    """
+    Interactive runner where INPUT, SIMULATION, INFERENCE and RENDERING are
+    separate asyncio tasks connected by small bounded queues:
+
+        input --(clicks)--> simulation --(obs)--> inference --(action)--> simulation
+        rendering draws whatever the latest state is, at its own frame rate
+
+    Input is polled far more often than frames are drawn, and the simulation
+    applies every queued click at the START of its next tick. A click injected
+    into the task queue therefore takes effect on the next tick, however slow
+    rendering is.
+    """
+
+    def __init__(self, env, model=None, sim_hz=10, render_fps=30, input_hz=120):
+        self.env = env
+        self.model = model
+        self.sim_period = 1 / sim_hz
+        self.render_period = 1 / render_fps
+        self.input_period = 1 / input_hz
+
+        self.input_queue = asyncio.Queue(maxsize=64)  # clicks -> simulation
+        self.obs_queue = asyncio.Queue(maxsize=1)     # simulation -> inference
+        self.action_queue = asyncio.Queue(maxsize=1)  # inference -> simulation
+        self.running = True
+
+    # --- A. INPUT ---
+    async def input_loop(self):
+        while self.running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.running = False
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    mx, my = event.pos
+                    clicked_pos = (mx // self.env.cell_size, my // self.env.cell_size)
+                    try:
+                        self.input_queue.put_nowait((event.button, clicked_pos))
+                    except asyncio.QueueFull:
+                        print(f"[USER] Too many clicks queued, ignoring {clicked_pos}")
+            await asyncio.sleep(self.input_period)
+
+    # --- B. INFERENCE ---
+    async def inference_loop(self):
+        loop = asyncio.get_running_loop()
+        while self.running:
+            obs = await self.obs_queue.get()
+            if self.model:
+                predict = functools.partial(self.model.predict, obs, deterministic=True)
+                action, _ = await loop.run_in_executor(None, predict)
+            else:
+                action = self.env.action_space.sample()
+            await self.action_queue.put(action)
+
+    # --- C. SIMULATION ---
+    def apply_inputs(self):
+        while not self.input_queue.empty():
+            button, clicked_pos = self.input_queue.get_nowait()
+            if button == 1:
+                self.inject_task(clicked_pos)
+            elif button == 3:
+                self.inspect(clicked_pos)
+
+    def inject_task(self, clicked_pos):
+        env = self.env
+        if clicked_pos not in env.sector_map:
+            print(f"[USER] Clicked {clicked_pos} - Not a valid target.")
+            return
+        print(f"[USER] Priority Task assigned at {clicked_pos}")
+        # Inject task at FRONT of queue (High Priority)
+        env.task_queue.insert(0, clicked_pos)
+        # Wake Up Logic: sleeping (Terminated) agents pick the new job up
+        for agent in env.agents:
+            if agent.state == "TERMINATED":
+                agent.state = "IDLE"
+                agent.task_complete = True
+
+    def inspect(self, clicked_pos):
+        for agent in self.env.agents:
+            if agent.pos == clicked_pos:
+                print(f"=== AGENT {agent.id} REPORT ===")
+                print(f" State:      {agent.state}")
+                print(f" Patience:   {agent.patience} / {agent.max_patience}")
+                print(f" Target:     {agent.target}")
+                print(f" Path Next:  {agent.path[:3]}...")
+                return
+        print(f"[INSPECTOR] {clicked_pos} -> Empty tile.")
+
+    async def simulation_loop(self):
+        loop = asyncio.get_running_loop()
+        obs, _ = self.env.reset()
+        while self.running:
+            tick_start = loop.time()
+
+            self.apply_inputs()
+            await self.obs_queue.put(obs)
+            action = await self.action_queue.get()
+            obs, reward, terminated, truncated, info = self.env.step(action)
+            # Note: We keep ticking even if terminated, so clicks can add more tasks.
+
+            await asyncio.sleep(max(0.0, self.sim_period - (loop.time() - tick_start)))
+
+    # --- D. RENDERING ---
+    async def render_loop(self):
+        while self.running:
+            self.env.draw_frame()
+            await asyncio.sleep(self.render_period)
+
+    async def run(self):
+        self.env.draw_frame() # Opens the window before we start polling events
+        tasks = [
+            asyncio.create_task(self.input_loop()),
+            asyncio.create_task(self.inference_loop()),
+            asyncio.create_task(self.simulation_loop()),
+            asyncio.create_task(self.render_loop()),
+        ]
+        # The input task ends when the window is closed
+        await tasks[0]
+        for task in tasks[1:]:
+            task.cancel()
+        await asyncio.gather(*tasks[1:], return_exceptions=True)
+        self.env.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interactive simulation with decoupled input, simulation and rendering.")
+    parser.add_argument("--model", default="models/PPO/warehouse_final_mas", help="Saved PPO model")
+    parser.add_argument("--server", default=None, help="Use a running inference_server.py instead of a local model")
+    parser.add_argument("--sim-hz", type=float, default=10, help="Simulation ticks per second")
+    parser.add_argument("--fps", type=float, default=30, help="Rendered frames per second")
+    args = parser.parse_args()
+
+    model = None
+    try:
+        if args.server:
+            from inference_server import PolicyClient
+            model = PolicyClient(args.server)
+        else:
+            from policy_loader import load_model
+            model = load_model(args.model)
+    except (FileNotFoundError, ConnectionError):
+        print(f"WARNING: Could not reach {args.server or args.model}")
+        print("Running in RANDOM mode (Agents will pick random tasks).")
+
+    env = WarehouseEnv(render_mode="human", num_agents=4)
+    asyncio.run(AsyncRunner(env, model, args.sim_hz, args.fps).run())
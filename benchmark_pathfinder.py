@@ -0,0 +1,105 @@
+# benchmark_pathfinder.py
+import random
+import time
+
+from warehouse_map import build_map, build_sectors
+from pathfinder import a_star_search, GridGraph, HAS_NUMBA
+from hierarchical_planner import HierarchicalPlanner
+
+# --- CONFIGURATION ---
+NUM_QUERIES = 2000
+SEED = 0
+MAP_SIZES = [(28, 18), (60, 34), (100, 62), (200, 122)] # Heights of the form 4k + 2
+SIZE_QUERIES = 200
+SEGMENTS = 2 # refine_segments used by WarehouseEnv(planner="hpa")
+
+def make_queries(allowed_moves, count, seed):
+    """Random start/goal pairs on walkable tiles, some with a dynamic obstacle."""
+    rng = random.Random(seed)
+    cells = sorted(allowed_moves.keys())
+    queries = []
+    for i in range(count):
+        start, goal = rng.sample(cells, 2)
+        obstacles = {rng.choice(cells)} if i % 4 == 0 else None
+        queries.append((start, goal, obstacles))
+    return queries
+
+def time_planner(name, search, queries):
+    start_time = time.perf_counter()
+    paths = [search(start, goal, obstacles) for start, goal, obstacles in queries]
+    elapsed = time.perf_counter() - start_time
+    print(f"{name:<22} {elapsed * 1000:8.1f} ms   {1e6 * elapsed / len(queries):7.1f} us/query")
+    return paths, elapsed
+
+def benchmark_map_sizes():
+    """
+    Per-query plan time vs. map size: flat A* against sector-level HPA*.
+    "HPA*" is whole paths, building each goal field on first use.
+    """
+    print("---------------------------------------")
+    print("Map size sweep (ms per query)")
+    print("---------------------------------------")
+    print(f"{'map':<10} {'dict A*':>9} {'array A*':>9} {'HPA*':>9} {'HPA* seg':>9} {'HPA* build':>11} {'path len':>9}")
+    for width, height in MAP_SIZES:
+        grid, allowed_moves = build_map(width, height)
+        queries = make_queries(allowed_moves, SIZE_QUERIES, SEED)
+        queries = [(start, goal, None) for start, goal, _ in queries]
+
+        start_time = time.perf_counter()
+        hpa = HierarchicalPlanner(allowed_moves, build_sectors(grid))
+        build_time = time.perf_counter() - start_time
+
+        graph = GridGraph(allowed_moves)
+        graph.search(queries[0][0], queries[0][1]) # JIT warm-up
+
+        timings = []
+        results = []
+        for search in (lambda s, g: a_star_search(s, g, allowed_moves), graph.search, hpa):
+            start_time = time.perf_counter()
+            results.append([search(start, goal) for start, goal, _ in queries])
+            timings.append(1000 * (time.perf_counter() - start_time) / len(queries))
+
+        # HPA* paths are near-optimal: compare total length against exact A*
+        ratio = sum(len(p) for p in results[2]) / max(sum(len(p) for p in results[0]), 1)
+
+        # What the env does: SEGMENTS legs at a time, asking again at the end
+        # of each (the goal fields are cached by now, as they are mid-shift)
+        hpa.refine_segments = SEGMENTS
+        count = 0
+        start_time = time.perf_counter()
+        for start, goal, _ in queries:
+            while start != goal:
+                start = hpa(start, goal)[-1]
+                count += 1
+        segment_time = 1000 * (time.perf_counter() - start_time) / max(count, 1)
+
+        size = f"{width}x{height}"
+        print(f"{size:<10} {timings[0]:9.2f} {timings[1]:9.2f} {timings[2]:9.2f} {segment_time:9.2f} "
+              f"{build_time * 1000:9.0f}ms {ratio:8.3f}x")
+
+if __name__ == "__main__":
+    grid, allowed_moves = build_map()
+    queries = make_queries(allowed_moves, NUM_QUERIES, SEED)
+
+    print("---------------------------------------")
+    print(f"A* benchmark: {NUM_QUERIES} queries on {len(grid[0])}x{len(grid)} map")
+    print("---------------------------------------")
+
+    reference, base_time = time_planner(
+        "dict A* (baseline)", lambda s, g, o: a_star_search(s, g, allowed_moves, o), queries
+    )
+
+    backends = [("array A* (python)", GridGraph(allowed_moves, use_numba=False))]
+    if HAS_NUMBA:
+        numba_graph = GridGraph(allowed_moves, use_numba=True)
+        numba_graph.search(queries[0][0], queries[0][1]) # Trigger JIT compile outside the timer
+        backends.append(("array A* (numba)", numba_graph))
+    else:
+        print("(numba not installed - skipping JIT backend)")
+
+    for name, graph in backends:
+        paths, elapsed = time_planner(name, graph.search, queries)
+        same = sum(p == r for p, r in zip(paths, reference))
+        print(f"{'':<22} speedup x{base_time / elapsed:.1f}, identical paths {same}/{len(queries)}")
+
+    benchmark_map_sizes()
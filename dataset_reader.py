@@ -0,0 +1,74 @@
+# dataset_reader.py
+import json
+import os
+import numpy as np
+
+class EpisodeDataset:
+    """
+    Memory-mapped view of a dataset written by
+    'generate_dataset.py --format npy'. Nothing is read into RAM until a
+    minibatch asks for its rows.
+    decisions_only: keep just the steps where the action dispatched a task
+    (on every other step the action is ignored by the env).
+    """
+
+    def __init__(self, path, decisions_only=True):
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"{path} is not a finished dataset (no meta.json)")
+        with open(meta_path) as f:
+            self.meta = json.load(f)
+
+        # Files are preallocated; only the first 'steps' rows were written
+        steps = self.meta["steps"]
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")[:steps]
+        self.obs = load("obs")
+        self.actions = load("actions")
+        self.rewards = load("rewards")
+        self.dones = load("dones")
+        self.decisions = load("decisions")
+
+        if decisions_only:
+            self.indices = np.flatnonzero(self.decisions)
+        else:
+            self.indices = np.arange(steps)
+
+    def __len__(self):
+        return len(self.indices)
+
+    @property
+    def obs_size(self):
+        return self.obs.shape[1]
+
+    def returns(self, gamma, rewards=None):
+        """
+        Discounted return from every step to the end of its episode (1-D, in RAM).
+        The last, unfinished episode is simply cut off at the end of the data.
+        'rewards' replaces the logged per-step rewards (e.g. normalised ones).
+        """
+        rewards = np.asarray(self.rewards if rewards is None else rewards, dtype=np.float64)
+        dones = np.asarray(self.dones)
+        out = np.zeros(len(rewards), dtype=np.float32)
+        running = 0.0
+        for i in range(len(rewards) - 1, -1, -1):
+            if dones[i]:
+                running = 0.0
+            running = rewards[i] + gamma * running
+            out[i] = running
+        return out
+
+    def minibatches(self, batch_size, shuffle=True, seed=None, drop_last=False):
+        """
+        Yields (indices, obs, actions) for one pass over the data. Each batch
+        only touches its own rows of the memory map; indices are sorted
+        inside a batch so the reads stay as sequential as possible.
+        """
+        order = self.indices
+        if shuffle:
+            order = np.random.default_rng(seed).permutation(order)
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            if drop_last and len(idx) < batch_size:
+                break
+            idx = np.sort(idx)
+            yield idx, np.asarray(self.obs[idx]), np.asarray(self.actions[idx])
@@ -2,7 +2,7 @@
 import pygame
 import time
 from warehouse_env import WarehouseEnv
-from stable_baselines3 import PPO
+from policy_loader import load_model
 
 # Load the trained model
 models_dir = "models/PPO"
@@ -12,9 +12,10 @@ print(f"Loading model from {model_path}...")
 
 # Create env with all agents active for debugging
 env = WarehouseEnv(render_mode="human", num_agents=4, active_agents=4)
-model = PPO.load(model_path, env=env)
+model = load_model(model_path)
 
 obs, _ = env.reset()
+env.render() # Open the window before polling input
 running = True
 
 print("------------------------------------------------")
@@ -24,14 +25,7 @@ print(" [RIGHT CLICK] -> Inspect Agent (Brain Dump)")
 print("------------------------------------------------")
 
 while running:
-    # 1. Predict Action
-    action, _ = model.predict(obs)
-    
-    # 2. Step Environment
-    obs, reward, terminated, truncated, info = env.step(action)
-    env.render()
-    
-    # 3. Handle Human Input
+    # 1. Handle Human Input (BEFORE stepping, so clicks apply on this tick)
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
@@ -96,6 +90,13 @@ while running:
                 else:
                     print(" -> Empty tile.")
 
+    # 2. Predict Action
+    action, _ = model.predict(obs)
+    
+    # 3. Step Environment
+    obs, reward, terminated, truncated, info = env.step(action)
+    env.render()
+
     if terminated:
         print("Episode finished. Resetting...")
         obs, _ = env.reset()
@@ -0,0 +1,21 @@
+# dispatchers.py
+# Hand-written dispatch rules. Same job as the PPO brain: pick index 0, 1 or 2
+# from the head of the task queue. Each one is a function: env -> action.
+
+def fifo_dispatch(env):
+    """Always take the oldest task (index 0)."""
+    return 0
+
+def nearest_dispatch(env):
+    """Take whichever of the next 3 tasks is closest to the Shed (Manhattan)."""
+    candidates = env.task_queue[:env.action_space.n]
+    if not candidates:
+        return 0
+    shed_x, shed_y = env.shed_pos
+    distances = [abs(x - shed_x) + abs(y - shed_y) for (x, y) in candidates]
+    return distances.index(min(distances))
+
+HEURISTICS = {
+    "fifo": fifo_dispatch,
+    "nearest": nearest_dispatch,
+}
@@ -0,0 +1,105 @@
+# docks.py
+# Sheds / loading docks: where agents go between tasks to pick up new work.
+# The default layout is the single 2-tile Shed at the bottom centre of the map.
+
+from pathfinder import distance_field
+
+class Dock:
+    """
+    A loading point made of one or more tiles.
+    - capacity: how many agents may stand on its tiles at once (None = no limit).
+      Agents heading here wait at the entrance until a slot frees up.
+    - queue: ids of the agents routed here that have not arrived yet, in the
+      order they were sent. Free slots are handed out in this order.
+    """
+
+    def __init__(self, tiles, capacity=None, name=None, pos=None):
+        self.tiles = [tuple(t) for t in tiles]
+        if not self.tiles:
+            raise ValueError("A dock needs at least one tile")
+        self.capacity = capacity
+        self.name = name
+        # Reference point for observations and task vectors
+        self.pos = tuple(pos) if pos is not None else self.tiles[0]
+        self.fields = {}
+
+        # --- Live State ---
+        self.queue = []
+        # --- Utilisation Metrics ---
+        self.ticks = 0          # Ticks observed
+        self.busy_ticks = 0     # Ticks with at least one agent on the dock
+        self.slot_ticks = 0     # Sum of agents on the dock over all ticks
+        self.queue_ticks = 0    # Sum of queue lengths over all ticks
+        self.dispatches = 0     # Tasks handed out here
+
+    @classmethod
+    def from_spec(cls, spec):
+        """
+        Builds a Dock from a dict like {"tiles": [[13, 16]], "capacity": 2}.
+        Dock objects are copied, so several envs never share a queue.
+        """
+        if isinstance(spec, Dock):
+            return cls(spec.tiles, spec.capacity, spec.name, spec.pos)
+        return cls(spec["tiles"], spec.get("capacity"), spec.get("name"), spec.get("pos"))
+
+    def build_fields(self, allowed_moves):
+        """Precomputes the exact distance from every tile to each dock tile."""
+        for tile in self.tiles:
+            if tile not in allowed_moves:
+                raise ValueError(f"Dock tile {tile} is not walkable")
+        self.fields = {tile: distance_field(tile, allowed_moves) for tile in self.tiles}
+
+    def distance(self, pos):
+        """Steps from pos to the closest tile of this dock (None if unreachable)."""
+        best = None
+        for field in self.fields.values():
+            d = field.get(pos)
+            if d is not None and (best is None or d < best):
+                best = d
+        return best
+
+    def nearest_tile(self, pos):
+        reachable = [t for t in self.tiles if pos in self.fields[t]]
+        if not reachable:
+            return self.tiles[0]
+        return min(reachable, key=lambda t: self.fields[t][pos])
+
+    def has_room(self, occupants):
+        return self.capacity is None or occupants + len(self.queue) < self.capacity
+
+    def record(self, occupants, ticks=1):
+        """Called once per tick with the number of agents standing on the dock."""
+        self.ticks += ticks
+        self.slot_ticks += occupants * ticks
+        self.queue_ticks += len(self.queue) * ticks
+        if occupants:
+            self.busy_ticks += ticks
+
+    def metrics(self):
+        """Per-dock utilisation summary."""
+        ticks = max(self.ticks, 1)
+        slots = self.capacity if self.capacity is not None else len(self.tiles)
+        return {
+            "name": self.name,
+            "tiles": list(self.tiles),
+            "capacity": self.capacity,
+            "dispatches": self.dispatches,
+            "busy_ratio": self.busy_ticks / ticks,
+            "utilisation": self.slot_ticks / (ticks * slots),
+            "mean_queue": self.queue_ticks / ticks,
+        }
+
+    def get_state(self):
+        return (list(self.queue), self.ticks, self.busy_ticks,
+                self.slot_ticks, self.queue_ticks, self.dispatches)
+
+    def set_state(self, state):
+        (queue, self.ticks, self.busy_ticks,
+         self.slot_ticks, self.queue_ticks, self.dispatches) = state
+        self.queue = list(queue)
+
+
+def default_docks(width, height, capacity):
+    """The classic layout: one Shed on the two bottom-centre tiles."""
+    return [Dock([(width // 2 - 1, height - 2), (width // 2, height - 2)],
+                 capacity=capacity, name="shed", pos=(width // 2, height - 2))]
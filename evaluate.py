@@ -0,0 +1,197 @@
+# evaluate.py
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+
+from warehouse_env import WarehouseEnv
+from dispatchers import HEURISTICS
+from policy_loader import SharedPolicy, init_worker, worker_policy
+
+# Two-sided 95% Student-t critical values (df = 1..30), normal beyond that
+T_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+# Metrics reported in the summary table (key, label)
+# (Makespan only counts finished episodes: a cut-off one has no makespan)
+REPORT = [
+    ("makespan", "Makespan (finished)"),
+    ("tasks_completed", "Tasks completed"),
+    ("tasks_per_hour", "Tasks / hour"),
+    ("wait_ticks", "WAIT ticks"),
+    ("wait_per_task", "WAIT ticks / task"),
+    ("replans", "Replans"),
+    ("collisions", "Blocked collisions"),
+    ("dock_utilisation", "Dock utilisation"),
+    ("reward", "Total reward"),
+]
+
+# ==========================================
+# WORKER SIDE
+# ==========================================
+def make_policy(spec, env_kwargs, seed):
+    """
+    Turns a policy name into a function (env, obs) -> action.
+    'fifo' / 'nearest' / 'random' / 'rollout', or a path to a saved PPO model.
+    """
+    if spec in HEURISTICS:
+        dispatch = HEURISTICS[spec]
+        return lambda env, obs: dispatch(env)
+
+    if spec == "random":
+        rng = random.Random(seed)
+        return lambda env, obs: rng.randrange(env.action_space.n)
+
+    if spec == "rollout":
+        from rollout_dispatcher import RolloutDispatcher
+        dispatcher = RolloutDispatcher(n_workers=1, seed=seed) # Workers copy the env it is given
+        policy = lambda env, obs: dispatcher.predict(env)
+        policy.close = dispatcher.close # Shuts its process pool down
+        return policy
+
+    # Anything else is a model path: its weights were shared by the parent process
+    policy = worker_policy()
+    return lambda env, obs: int(policy.predict(obs, deterministic=True)[0])
+
+def close_policy(policy):
+    """Releases whatever make_policy() started (the rollout worker pool)."""
+    close = getattr(policy, "close", None)
+    if close is not None:
+        close()
+
+def run_episode(spec, seed, env_kwargs, max_ticks, seconds_per_tick):
+    env = WarehouseEnv(render_mode=None, **env_kwargs)
+    policy = make_policy(spec, env_kwargs, seed)
+    obs, _ = env.reset(seed=seed)
+
+    totals = {"tasks_completed": 0, "wait_ticks": 0, "replans": 0,
+              "vertex_conflicts": 0, "edge_conflicts": 0}
+    reward_sum = 0.0
+    ticks = 0
+    terminated = False
+
+    try:
+        while not terminated and ticks < max_ticks:
+            obs, reward, terminated, truncated, info = env.step(policy(env, obs))
+            reward_sum += reward
+            ticks += info.get("ticks", 1) # Event-driven envs may cover several ticks per step
+            for name in totals:
+                totals[name] += info.get(name, 0)
+    finally:
+        close_policy(policy)
+
+    hours = ticks * seconds_per_tick / 3600
+    docks = env.dock_metrics()
+    return {
+        "seed": seed,
+        "finished": terminated,
+        "makespan": ticks,
+        "reward": reward_sum,
+        "tasks_per_hour": totals["tasks_completed"] / hours if hours > 0 else 0.0,
+        "wait_per_task": totals["wait_ticks"] / max(totals["tasks_completed"], 1),
+        "collisions": totals["vertex_conflicts"] + totals["edge_conflicts"],
+        "dock_utilisation": sum(d["utilisation"] for d in docks) / len(docks),
+        "docks": docks,
+        **totals,
+    }
+
+# ==========================================
+# STATISTICS
+# ==========================================
+def confidence_interval(values):
+    """Mean and the half-width of its 95% confidence interval."""
+    mean = statistics.fmean(values)
+    if len(values) < 2:
+        return mean, float("nan")
+    df = len(values) - 1
+    t = T_95[df - 1] if df <= len(T_95) else 1.96
+    return mean, t * statistics.stdev(values) / math.sqrt(len(values))
+
+def summarize(results):
+    summary = {}
+    finished = [r for r in results if r["finished"]]
+    for key, _ in REPORT:
+        values = [r[key] for r in (finished if key == "makespan" else results)]
+        mean, half_width = confidence_interval(values) if values else (float("nan"), float("nan"))
+        summary[key] = {"mean": mean, "ci95": half_width}
+    summary["finished"] = len(finished)
+    summary["episodes"] = len(results)
+    summary["completion_rate"] = len(finished) / len(results)
+    return summary
+
+def evaluate(spec, episodes=20, base_seed=0, env_kwargs=None, max_ticks=5000,
+             seconds_per_tick=1.0, workers=None):
+    """
+    Runs 'episodes' seeded episodes (seeds base_seed, base_seed+1, ...) over a
+    process pool. Same seeds -> same task lists, so checkpoints are compared
+    on identical shifts.
+    """
+    env_kwargs = env_kwargs if env_kwargs is not None else {"num_agents": 4, "active_agents": 4}
+    seeds = [base_seed + i for i in range(episodes)]
+
+    # A model is loaded ONCE here; the workers only get shared-memory weights
+    is_model = spec not in HEURISTICS and spec not in ("random", "rollout")
+    shared = SharedPolicy(spec) if is_model else None
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                             initializer=init_worker, initargs=(shared,)) as pool:
+        results = list(pool.map(
+            run_episode,
+            [spec] * episodes, seeds, [env_kwargs] * episodes,
+            [max_ticks] * episodes, [seconds_per_tick] * episodes
+        ))
+    return results, summarize(results)
+
+def print_report(spec, summary):
+    print("---------------------------------------")
+    print(f"Policy: {spec}")
+    print(f"Episodes finished: {summary['finished']}/{summary['episodes']} "
+          f"({summary['completion_rate']:.0%}, the rest hit --max-ticks)")
+    print("---------------------------------------")
+    for key, label in REPORT:
+        stats = summary[key]
+        print(f"{label:<20} {stats['mean']:10.2f} +/- {stats['ci95']:.2f}")
+    print("---------------------------------------")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless, parallel evaluation of dispatch policies.")
+    parser.add_argument("policies", nargs="+",
+                        help="Model path(s) or one of: fifo, nearest, random, rollout")
+    parser.add_argument("--episodes", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0, help="First episode seed")
+    parser.add_argument("--agents", type=int, default=4, help="Active agents")
+    parser.add_argument("--max-ticks", type=int, default=5000, help="Cut-off for deadlocked episodes")
+    parser.add_argument("--seconds-per-tick", type=float, default=1.0, help="Wall-clock length of one tick")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--docks", default=None,
+                        help='JSON file with a list of docks, e.g. [{"tiles": [[13, 16]], "capacity": 2}]')
+    parser.add_argument("--event-driven", action="store_true",
+                        help="Skip ticks in which only LOADING timers and patience count down")
+    parser.add_argument("--obs-mode", choices=["absolute", "egocentric"], default="absolute",
+                        help="Observation encoding the model was trained with")
+    parser.add_argument("--json", default=None, help="Also write per-episode results + summaries here")
+    args = parser.parse_args()
+
+    # Egocentric obs don't depend on the fleet size, so the fleet can be any size
+    num_agents = args.agents if args.obs_mode == "egocentric" else 4
+    env_kwargs = {"num_agents": num_agents, "active_agents": args.agents, "obs_mode": args.obs_mode}
+    if args.event_driven:
+        env_kwargs["event_driven"] = True
+    if args.docks:
+        with open(args.docks) as f:
+            env_kwargs["docks"] = json.load(f)
+    report = {}
+    for spec in args.policies:
+        results, summary = evaluate(spec, args.episodes, args.seed, env_kwargs,
+                                    args.max_ticks, args.seconds_per_tick, args.workers)
+        print_report(spec, summary)
+        report[spec] = {"summary": summary, "episodes": results}
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json}")
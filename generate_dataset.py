@@ -1,101 +1,205 @@
 # generate_dataset.py
+import argparse
 import csv
+import json
+import os
 import numpy as np
 from warehouse_env import WarehouseEnv
-from stable_baselines3 import PPO
+from evaluate import close_policy, make_policy
+from dispatchers import HEURISTICS
+from policy_loader import SharedPolicy, init_worker
 
 # --- CONFIGURATION ---
 MODEL_PATH = "models/PPO/warehouse_final_mas" # Path to your trained model
 OUTPUT_FILE = "warehouse_dataset.csv"
+DATASET_DIR = "datasets/warehouse"
 STEPS_TO_LOG = 1000 # How many timesteps to record
+EPISODE_STEPS = 2000 # Episodes are cut here (deadlocked shifts would never end)
 
-# 1. Setup Environment & Model
-env = WarehouseEnv(render_mode=None, num_agents=4, active_agents=4)
-model = PPO.load(MODEL_PATH, env=env)
-obs, _ = env.reset()
-
-print(f"Starting Data Collection...")
-print(f"Output Target: {OUTPUT_FILE}")
-
-# 2. Open File and Write Headers
-# We use the 'with' block to safely handle file opening/closing
-with open(OUTPUT_FILE, mode='w', newline='') as file:
-    writer = csv.writer(file)
-    
-    # DEFINE THE 12 COLUMNS (Features)
-    headers = [
-        "Step_ID",
-        "Agent_ID",
-        "Agent_Pos_X",
-        "Agent_Pos_Y",
-        "Task_1_Vector_X",
-        "Task_1_Vector_Y",
-        "Task_2_Vector_X",
-        "Task_2_Vector_Y",
-        "Task_3_Vector_X",
-        "Task_3_Vector_Y",
-        "Current_Patience",
-        "Is_Loading",
-        "Action_Chosen",   # (Dispatch Decision)
-        "Reward_Received"  # (Global Feedback)
-    ]
-    writer.writerow(headers)
+# DEFINE THE 12 COLUMNS (Features)
+CSV_HEADERS = [
+    "Step_ID",
+    "Agent_ID",
+    "Agent_Pos_X",
+    "Agent_Pos_Y",
+    "Task_1_Vector_X",
+    "Task_1_Vector_Y",
+    "Task_2_Vector_X",
+    "Task_2_Vector_Y",
+    "Task_3_Vector_X",
+    "Task_3_Vector_Y",
+    "Current_Patience",
+    "Is_Loading",
+    "Action_Chosen",   # (Dispatch Decision)
+    "Reward_Received"  # (Global Feedback)
+]
+
+# ==========================================
+# EPISODE DATA (memory-mapped .npy, see dataset_reader.py)
+# ==========================================
+# One folder per dataset, one row per env step:
+#   obs.npy        float32 (N, obs_size)  observation the action was chosen from
+#   actions.npy    int64   (N,)
+#   rewards.npy    float32 (N,)
+#   dones.npy      bool    (N,)           episode ended (or was cut) after this step
+#   decisions.npy  bool    (N,)           the action actually dispatched a task
+#   meta.json      steps, policy, seed, env settings
+# The arrays are preallocated on disk and filled in place, so long runs
+# never have to fit into RAM.
+
+class DatasetWriter:
+    def __init__(self, path, steps, obs_size, meta):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.meta = meta
+        self.size = 0
+        open_memmap = np.lib.format.open_memmap
+        self.obs = open_memmap(os.path.join(path, "obs.npy"), mode="w+", dtype=np.float32, shape=(steps, obs_size))
+        self.actions = open_memmap(os.path.join(path, "actions.npy"), mode="w+", dtype=np.int64, shape=(steps,))
+        self.rewards = open_memmap(os.path.join(path, "rewards.npy"), mode="w+", dtype=np.float32, shape=(steps,))
+        self.dones = open_memmap(os.path.join(path, "dones.npy"), mode="w+", dtype=bool, shape=(steps,))
+        self.decisions = open_memmap(os.path.join(path, "decisions.npy"), mode="w+", dtype=bool, shape=(steps,))
+
+    def append(self, obs, action, reward, done, decision):
+        i = self.size
+        self.obs[i] = obs
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.dones[i] = done
+        self.decisions[i] = decision
+        self.size += 1
+
+    def close(self):
+        for array in (self.obs, self.actions, self.rewards, self.dones, self.decisions):
+            array.flush()
+        # meta.json goes last: a dataset without it is incomplete
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump({**self.meta, "steps": self.size}, f, indent=2)
+
+# ==========================================
+# COLLECTION
+# ==========================================
+def collect(policy_spec, steps, output, fmt="csv", seed=0, env_kwargs=None, episode_steps=EPISODE_STEPS):
+    # 1. Setup Environment & Policy
+    env_kwargs = env_kwargs if env_kwargs is not None else {"num_agents": 4, "active_agents": 4}
+    env = WarehouseEnv(render_mode=None, **env_kwargs)
+    if policy_spec not in HEURISTICS and policy_spec not in ("random", "rollout"):
+        init_worker(SharedPolicy(policy_spec)) # A model path
+    policy = make_policy(policy_spec, env_kwargs, seed)
+    episode = 0
+    obs, _ = env.reset(seed=seed)
+    episode_tick = 0
+
+    print(f"Starting Data Collection...")
+    print(f"Output Target: {output}")
+
+    writer = None
+    if fmt == "npy":
+        writer = DatasetWriter(output, steps, env.observation_space.shape[0], {
+            "policy": policy_spec, "seed": seed, "env_kwargs": env_kwargs,
+            "episode_steps": episode_steps,
+        })
+        file = None
+    else:
+        # 2. Open File and Write Headers
+        file = open(output, mode='w', newline='')
+        csv_writer = csv.writer(file)
+        csv_writer.writerow(CSV_HEADERS)
 
     # 3. Simulation Loop
-    for step_num in range(STEPS_TO_LOG):
-        # Predict action from the Brain (PPO)
-        action, _ = model.predict(obs)
-        
+    for step_num in range(steps):
+        decision = env.needs_dispatch()
+        action = int(policy(env, obs))
+        prev_obs = obs
+
         # Step the environment
         obs, reward, terminated, truncated, info = env.step(action)
-        
-        # 4. Extract Data Per Agent
-        # We assume the 'Action' applies to the agent currently at the shed, 
-        # but for the dataset, we can log the global action for context.
-        
-        # Calculate Task Vectors (Shared global info)
-        # (Re-using logic from _get_obs to be accurate)
-        shed_x, shed_y = env.shed_pos
-        task_vectors = []
-        for i in range(3):
-            if i < len(env.task_queue):
-                t_pos = env.task_queue[i]
-                dx = t_pos[0] - shed_x
-                dy = t_pos[1] - shed_y
-                task_vectors.append((dx, dy))
-            else:
-                task_vectors.append((0, 0))
-        
-        # Write one row PER AGENT
-        for agent in env.agents:
-            # Feature Extraction
-            row = [
-                step_num,                   # Time
-                agent.id,                   # ID
-                agent.pos[0],               # Feat 1: Pos X
-                agent.pos[1],               # Feat 2: Pos Y
-                task_vectors[0][0],         # Feat 3: Task 1 dx
-                task_vectors[0][1],         # Feat 4: Task 1 dy
-                task_vectors[1][0],         # Feat 5: Task 2 dx
-                task_vectors[1][1],         # Feat 6: Task 2 dy
-                task_vectors[2][0],         # Feat 7: Task 3 dx
-                task_vectors[2][1],         # Feat 8: Task 3 dy
-                agent.patience,             # Feat 9: Patience
-                1 if agent.state == "LOADING" else 0, # Feat 10: Is Loading?
-                action,                     # Feat 11: The Dispatcher's Action
-                round(reward, 4)            # Feat 12: Reward (Rounded)
-            ]
-            
-            writer.writerow(row)
+        episode_tick += info.get("ticks", 1)
+        done = terminated or episode_tick >= episode_steps
+
+        if writer is not None:
+            writer.append(prev_obs, action, reward, done, decision)
+        else:
+            # 4. Extract Data Per Agent
+            # We assume the 'Action' applies to the agent currently at the shed,
+            # but for the dataset, we can log the global action for context.
+
+            # Calculate Task Vectors (Shared global info)
+            # (Re-using logic from _get_obs to be accurate)
+            shed_x, shed_y = env.shed_pos
+            task_vectors = []
+            for i in range(3):
+                if i < len(env.task_queue):
+                    t_pos = env.task_queue[i]
+                    dx = t_pos[0] - shed_x
+                    dy = t_pos[1] - shed_y
+                    task_vectors.append((dx, dy))
+                else:
+                    task_vectors.append((0, 0))
+
+            # Write one row PER AGENT
+            for agent in env.agents:
+                # Feature Extraction
+                row = [
+                    step_num,                   # Time
+                    agent.id,                   # ID
+                    agent.pos[0],               # Feat 1: Pos X
+                    agent.pos[1],               # Feat 2: Pos Y
+                    task_vectors[0][0],         # Feat 3: Task 1 dx
+                    task_vectors[0][1],         # Feat 4: Task 1 dy
+                    task_vectors[1][0],         # Feat 5: Task 2 dx
+                    task_vectors[1][1],         # Feat 6: Task 2 dy
+                    task_vectors[2][0],         # Feat 7: Task 3 dx
+                    task_vectors[2][1],         # Feat 8: Task 3 dy
+                    agent.patience,             # Feat 9: Patience
+                    1 if agent.state == "LOADING" else 0, # Feat 10: Is Loading?
+                    action,                     # Feat 11: The Dispatcher's Action
+                    round(reward, 4)            # Feat 12: Reward (Rounded)
+                ]
+
+                csv_writer.writerow(row)
 
         if step_num % 100 == 0:
-            print(f"Logged {step_num}/{STEPS_TO_LOG} steps...")
+            print(f"Logged {step_num}/{steps} steps...")
+
+        if done:
+            episode += 1
+            obs, _ = env.reset(seed=seed + episode)
+            episode_tick = 0
+
+    close_policy(policy)
+    if writer is not None:
+        writer.close()
+    else:
+        file.close()
+
+    print("---------------------------------------")
+    print("Data Collection Complete!")
+    print(f"Generated: {output}")
+    if fmt == "csv":
+        print("You can now open this file in Excel or use it for your report.")
+    else:
+        print("Read it with dataset_reader.EpisodeDataset (e.g. for the pretrain stage in train.py).")
+    print("---------------------------------------")
 
-        if terminated:
-            obs, _ = env.reset()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record simulation data for reports or behaviour cloning.")
+    parser.add_argument("--policy", default=MODEL_PATH,
+                        help="Model path or one of: fifo, nearest, random, rollout")
+    parser.add_argument("--steps", type=int, default=STEPS_TO_LOG)
+    parser.add_argument("--format", choices=["csv", "npy"], default="csv",
+                        help="csv = one row per agent for Excel, npy = memory-mapped episode data")
+    parser.add_argument("--output", default=None,
+                        help=f"Output file/folder (default: {OUTPUT_FILE} or {DATASET_DIR})")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first episode")
+    parser.add_argument("--agents", type=int, default=4, help="Active agents")
+    parser.add_argument("--episode-steps", type=int, default=EPISODE_STEPS)
+    parser.add_argument("--obs-mode", choices=["absolute", "egocentric"], default="absolute",
+                        help="Observation encoding to record (match the model you will train)")
+    args = parser.parse_args()
 
-print("---------------------------------------")
-print("Data Collection Complete!")
-print(f"File generated: {OUTPUT_FILE}")
-print("You can now open this file in Excel or use it for your report.")
-print("---------------------------------------")
\ No newline at end of file
+    output = args.output or (OUTPUT_FILE if args.format == "csv" else DATASET_DIR)
+    # Egocentric obs don't depend on the fleet size, so the fleet can be any size
+    num_agents = args.agents if args.obs_mode == "egocentric" else 4
+    collect(args.policy, args.steps, output, args.format, args.seed,
+            {"num_agents": num_agents, "active_agents": args.agents, "obs_mode": args.obs_mode}, args.episode_steps)
@@ -0,0 +1,270 @@
+# hierarchical_planner.py
+import heapq
+from collections import defaultdict, deque
+
+import numpy as np
+
+from pathfinder import FIELD_CACHE_SIZE, a_star_search, heuristic
+
+class HierarchicalPlanner:
+    """
+    HPA*-STYLE ROUTING for large maps.
+
+    1. CLUSTERS: Sectors from build_sectors(), cut every block_size columns.
+       Tiles outside the sectors (outer ring, middle aisles, shed row) are
+       grouped into block_size x block_size blocks.
+    2. ABSTRACT GRAPH: Tiles where a move crosses a cluster border are
+       'entrances'. Entrances are linked by those border moves (cost 1) and by
+       precomputed shortest paths INSIDE each cluster.
+    3. GOAL FIELDS: For each goal cluster (and the entrances that reach the
+       goal inside it) one backwards Dijkstra over the abstract graph gives
+       every entrance its remaining cost. Cached, so later queries to the
+       same area skip the abstract search entirely.
+    4. QUERY: a BFS of the start's cluster picks the best exit, then the
+       route walks downhill on the goal field, one leg per entrance, and each
+       leg is refined from a cache of intra-cluster paths.
+
+    Call it like a_star_search (WarehouseEnv(planner="hpa") does this).
+    With refine_segments=N only the first N legs are walked, so a query
+    costs the same on any map size; the agent simply asks again when that
+    partial path runs out. coarse_route() still runs the full abstract A*.
+    """
+
+    def __init__(self, allowed_moves, sector_map, block_size=8, refine_segments=None):
+        self.allowed_moves = allowed_moves
+        self.refine_segments = refine_segments
+        self.cluster = {}
+        for (x, y) in allowed_moves:
+            sector = sector_map.get((x, y))
+            if sector is not None:
+                # Long sectors are cut every block_size columns to keep clusters small
+                self.cluster[(x, y)] = ("S", sector, x // block_size)
+            else:
+                self.cluster[(x, y)] = ("B", x // block_size, y // block_size)
+
+        # --- ABSTRACT GRAPH ---
+        self.edges = defaultdict(dict)  # entrance -> {entrance: cost}
+        entrances = defaultdict(set)    # cluster -> its entrances
+        for cell in allowed_moves:
+            for next_node in self._neighbors(cell):
+                if self.cluster[cell] != self.cluster[next_node]:
+                    self.edges[cell][next_node] = 1
+                    entrances[self.cluster[cell]].add(cell)
+                    entrances[self.cluster[next_node]].add(next_node)
+        self.entrances = dict(entrances)
+
+        # Intra-cluster shortest paths between every pair of entrances
+        self.local_parents = {}  # entrance -> BFS parent links inside its cluster
+        self.local_costs = {}    # entrance -> BFS distances inside its cluster
+        for cluster, nodes in self.entrances.items():
+            for a in nodes:
+                costs, parents = self._cluster_bfs(a)
+                self.local_costs[a] = costs
+                self.local_parents[a] = parents
+                for b in nodes:
+                    if b != a and b in costs:
+                        self.edges[a][b] = costs[b]
+
+        # Backwards links by entrance index, for the goal fields
+        self.entrance_ids = {entrance: i for i, entrance in enumerate(self.edges)}
+        self.reverse_links = [[] for _ in self.entrance_ids]
+        for a, links in self.edges.items():
+            for b, cost in links.items():
+                self.reverse_links[self.entrance_ids[b]].append((self.entrance_ids[a], cost))
+
+        self.segment_cache = {}
+        self.field_cache = {}
+
+    def _neighbors(self, cell):
+        x, y = cell
+        for dx, dy in self.allowed_moves.get(cell, ()):
+            next_node = (x + dx, y + dy)
+            if next_node in self.allowed_moves:
+                yield next_node
+
+    def _cluster_bfs(self, source):
+        """Shortest paths from 'source' that never leave its cluster."""
+        cluster = self.cluster[source]
+        costs = {source: 0}
+        parents = {source: None}
+        frontier = deque([source])
+        while frontier:
+            current = frontier.popleft()
+            for next_node in self._neighbors(current):
+                if next_node not in costs and self.cluster[next_node] == cluster:
+                    costs[next_node] = costs[current] + 1
+                    parents[next_node] = current
+                    frontier.append(next_node)
+        return costs, parents
+
+    def coarse_route(self, start, goal):
+        """
+        Abstract A*: a list of waypoints (start, entrances..., goal), or []
+        if the goal cannot be reached.
+        """
+        return self._coarse_route(start, goal)[0]
+
+    def _coarse_route(self, start, goal):
+        start_costs, start_parents = self._cluster_bfs(start)
+
+        # Temporary links: start -> entrances of its cluster, entrances -> goal
+        start_links = {}
+        for entrance in self.entrances.get(self.cluster[start], ()):
+            if entrance in start_costs:
+                start_links[entrance] = start_costs[entrance]
+        if goal in start_costs:
+            start_links[goal] = start_costs[goal]
+
+        goal_links = {}
+        for entrance in self.entrances.get(self.cluster[goal], ()):
+            cost = self.local_costs[entrance].get(goal)
+            if cost is not None:
+                goal_links[entrance] = cost
+
+        frontier = [(0, start)]
+        came_from = {start: None}
+        cost_so_far = {start: 0}
+        while frontier:
+            _, current = heapq.heappop(frontier)
+            if current == goal:
+                break
+
+            links = start_links if current == start else self.edges.get(current, {})
+            if current in goal_links:
+                links = dict(links)
+                links[goal] = goal_links[current]
+
+            for next_node, step in links.items():
+                new_cost = cost_so_far[current] + step
+                if next_node not in cost_so_far or new_cost < cost_so_far[next_node]:
+                    cost_so_far[next_node] = new_cost
+                    came_from[next_node] = current
+                    heapq.heappush(frontier, (new_cost + heuristic(next_node, goal), next_node))
+
+        if goal not in came_from:
+            return [], start_parents
+        route = [goal]
+        while route[-1] != start:
+            route.append(came_from[route[-1]])
+        route.reverse()
+        return route, start_parents
+
+    def goal_field(self, goal):
+        """
+        Abstract cost from every entrance (by index) to an entrance of the
+        goal's cluster that reaches the goal without leaving it; inf where
+        there is none. Depends only on that cluster and entrance set, so
+        many goals share one field.
+        """
+        cluster = self.cluster[goal]
+        seeds = tuple(e for e in self.entrances.get(cluster, ()) if goal in self.local_costs[e])
+        key = (cluster, seeds)
+        field = self.field_cache.get(key)
+        if field is not None:
+            return field, seeds
+
+        costs = [float("inf")] * len(self.entrance_ids)
+        frontier = []
+        for seed in seeds:
+            costs[self.entrance_ids[seed]] = 0
+            frontier.append((0, self.entrance_ids[seed]))
+        heapq.heapify(frontier)
+        while frontier:
+            cost, current = heapq.heappop(frontier)
+            if cost > costs[current]:
+                continue
+            for previous, step in self.reverse_links[current]:
+                new_cost = cost + step
+                if new_cost < costs[previous]:
+                    costs[previous] = new_cost
+                    heapq.heappush(frontier, (new_cost, previous))
+
+        field = np.array(costs)
+        if len(self.field_cache) >= FIELD_CACHE_SIZE:
+            self.field_cache.pop(next(iter(self.field_cache))) # Drop the oldest field
+        self.field_cache[key] = field
+        return field, seeds
+
+    def _descend(self, start, goal, segments=None):
+        """Tiles from start towards goal, at most 'segments' legs of them."""
+        start_costs, start_parents = self._cluster_bfs(start)
+        if goal in start_costs:
+            return [start] + self._trace(start_parents, start, goal)
+
+        field, seeds = self.goal_field(goal)
+        ids = self.entrance_ids
+        best, best_cost = None, float("inf")
+        for entrance in self.entrances.get(self.cluster[start], ()):
+            if entrance in start_costs:
+                cost = start_costs[entrance] + field[ids[entrance]]
+                if cost < best_cost:
+                    best, best_cost = entrance, cost
+        if best is None:
+            return []
+
+        path = [start] + self._trace(start_parents, start, best)
+        legs = 0 if best == start else 1
+        current = best
+        while segments is None or legs < segments:
+            if current in seeds:
+                path.extend(self._segment(current, goal))
+                break
+            # Downhill: the link that keeps the remaining cost exact
+            remaining = field[ids[current]]
+            for next_node, step in self.edges[current].items():
+                if step + field[ids[next_node]] == remaining:
+                    break
+            path.extend(self._segment(current, next_node))
+            current = next_node
+            legs += 1
+        return path
+
+    def _segment(self, a, b):
+        """Tiles from entrance a to b (excluding a), from the cache when possible."""
+        if self.cluster[a] != self.cluster[b]:
+            return [b] # Border crossing: one step
+
+        key = (a, b)
+        if key not in self.segment_cache:
+            self.segment_cache[key] = self._trace(self.local_parents[a], a, b)
+        return self.segment_cache[key]
+
+    def _trace(self, parents, a, b):
+        tiles = []
+        current = b
+        while current != a:
+            tiles.append(current)
+            current = parents[current]
+        tiles.reverse()
+        return tiles
+
+    def refine(self, route, start_parents, segments=None):
+        """
+        Turns waypoints into tiles. The first leg starts at the query's start
+        (usually not an entrance), so it uses that query's own BFS.
+        """
+        legs = list(zip(route, route[1:]))
+        if segments is not None:
+            legs = legs[:segments]
+        path = [route[0]]
+        for i, (a, b) in enumerate(legs):
+            if i == 0 and self.cluster[a] == self.cluster[b]:
+                path.extend(self._trace(start_parents, a, b))
+            else:
+                path.extend(self._segment(a, b))
+        return path
+
+    def __call__(self, start, goal, allowed_moves=None, obstacles=None):
+        if start == goal:
+            return [start]
+        if start not in self.cluster or goal not in self.cluster:
+            return a_star_search(start, goal, self.allowed_moves, obstacles)
+
+        path = self._descend(start, goal, self.refine_segments)
+        if not path:
+            return []
+
+        # The abstract graph knows nothing about this query's extra walls
+        if obstacles and any(tile in obstacles for tile in path):
+            return a_star_search(start, goal, self.allowed_moves, obstacles)
+        return path
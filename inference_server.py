@@ -0,0 +1,177 @@
+# inference_server.py
+import argparse
+import asyncio
+import os
+import socket
+import struct
+
+import numpy as np
+
+from policy_loader import SharedPolicy
+
+DEFAULT_SOCKET = "/tmp/warehouse_policy.sock"
+
+# --- WIRE FORMAT ---
+# Request:  uint32 N (big-endian) followed by N float32 observation values
+# Response: int32 action, or ERROR if the request could not be answered
+HEADER = struct.Struct("!I")
+ACTION = struct.Struct("!i")
+ERROR = -1
+
+# ==========================================
+# SERVER
+# ==========================================
+class InferenceServer:
+    """
+    One policy process for many simulators. Requests from all clients land in
+    one queue; the batcher waits at most 'max_delay_ms' after the first request
+    to collect up to 'max_batch' observations, then answers them with a single
+    batched forward pass.
+    """
+
+    def __init__(self, model_path, max_batch=64, max_delay_ms=2.0):
+        self.policy = SharedPolicy(model_path)
+        self.obs_size = int(np.prod(self.policy.policy.observation_space.shape))
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.queue = None
+        self.batches = 0
+        self.requests = 0
+
+    async def handle_client(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                header = await reader.readexactly(HEADER.size)
+                (size,) = HEADER.unpack(header)
+                payload = await reader.readexactly(4 * size)
+                if size != self.obs_size:
+                    # Read in full anyway, so the stream stays in step
+                    writer.write(ACTION.pack(ERROR))
+                    await writer.drain()
+                    continue
+                obs = np.frombuffer(payload, dtype=">f4").astype(np.float32)
+
+                future = loop.create_future()
+                await self.queue.put((obs, future))
+                try:
+                    action = await future
+                except Exception:
+                    action = ERROR # The batcher already reported it
+
+                writer.write(ACTION.pack(action))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass # Client went away
+        finally:
+            writer.close()
+
+    async def batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+
+            # Collect more requests until the batch is full or the deadline passes
+            while len(batch) < self.max_batch:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                obs_batch = np.stack([obs for obs, _ in batch])
+                # Run the forward pass off the event loop so clients keep streaming in
+                actions, _ = await loop.run_in_executor(None, self.policy.predict, obs_batch, True)
+            except Exception as exc:
+                # Fail this batch only; the batcher must keep serving everyone else
+                print(f"Batch of {len(batch)} failed: {exc!r}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            for (_, future), action in zip(batch, np.asarray(actions).reshape(-1)):
+                if not future.cancelled():
+                    future.set_result(int(action))
+            self.batches += 1
+            self.requests += len(batch)
+
+    async def serve(self, socket_path=DEFAULT_SOCKET, port=None):
+        self.queue = asyncio.Queue()
+        if port is not None:
+            server = await asyncio.start_server(self.handle_client, "127.0.0.1", port)
+            where = f"127.0.0.1:{port}"
+        else:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            server = await asyncio.start_unix_server(self.handle_client, path=socket_path)
+            where = socket_path
+
+        print(f"Policy server listening on {where} (batch <= {self.max_batch}, "
+              f"deadline {self.max_delay * 1000:.1f} ms)")
+        batcher = asyncio.create_task(self.batcher())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+
+# ==========================================
+# CLIENT SHIM
+# ==========================================
+class PolicyClient:
+    """
+    Drop-in for 'model' in simulator loops: client.predict(obs) returns
+    (action, None) just like PPO.predict. The server always acts
+    deterministically, so 'deterministic' is accepted but ignored.
+    'address' is a Unix socket path or a localhost port number.
+    """
+
+    def __init__(self, address=DEFAULT_SOCKET):
+        if isinstance(address, int) or str(address).isdigit():
+            self.sock = socket.create_connection(("127.0.0.1", int(address)))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(address)
+
+    def predict(self, obs, deterministic=True):
+        obs = np.asarray(obs, dtype=">f4").reshape(-1)
+        self.sock.sendall(HEADER.pack(obs.size) + obs.tobytes())
+
+        reply = b""
+        while len(reply) < ACTION.size:
+            chunk = self.sock.recv(ACTION.size - len(reply))
+            if not chunk:
+                raise ConnectionError("Policy server closed the connection")
+            reply += chunk
+        action = ACTION.unpack(reply)[0]
+        if action == ERROR:
+            raise ValueError(f"Policy server could not answer for an observation of {obs.size} values "
+                             "(wrong size for the model, or its batch failed)")
+        return action, None
+
+    def close(self):
+        self.sock.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local batching inference server for the dispatcher policy.")
+    parser.add_argument("model", help="Path to a saved PPO model")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket path")
+    parser.add_argument("--port", type=int, default=None, help="Listen on localhost:PORT instead of a socket")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-delay-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    server = InferenceServer(args.model, args.max_batch, args.max_delay_ms)
+    try:
+        asyncio.run(server.serve(args.socket, args.port))
+    except KeyboardInterrupt:
+        print(f"\nServed {server.requests} requests in {server.batches} batches.")
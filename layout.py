@@ -0,0 +1,356 @@
+# layout.py
+# Declarative warehouse layouts (.layout files) and their compiled, cached form.
+#
+# A layout file has four sections, one text row per map row:
+#
+#   [grid]     Tile types, same characters as warehouse_map (# = + S P .)
+#   [moves]    Allowed moves per tile as ONE hex digit, a bitmask of
+#              U=1 D=2 L=4 R=8 ('.' = not walkable, '0' = walkable, no moves)
+#   [sectors]  Sector id per tile in base 62 (0-9, a-z, A-Z), '.' = no sector
+#   [docks]    One dock per line: name x,y [x,y ...] [capacity=N] [pos=x,y]
+#
+# Lines starting with ';' are comments. See layouts/default.layout.
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections import deque
+
+import numpy as np
+
+from warehouse_map import UP, DOWN, LEFT, RIGHT
+from pathfinder import register_distance_table
+
+# Bump this whenever the compiled format changes; old caches are then ignored
+LAYOUT_CACHE_VERSION = 1
+
+MOVE_BITS = {UP: 1, DOWN: 2, LEFT: 4, RIGHT: 8}
+SECTOR_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+NO_TILE = "."
+
+# All-pairs distances are only precomputed up to this many walkable tiles
+# (the int32 table is cells^2 * 4 bytes, i.e. 256 MB at the limit)
+DISTANCE_TABLE_LIMIT = 8192
+
+# ==========================================
+# PARSING / WRITING
+# ==========================================
+def parse_layout(text):
+    """
+    Reads the text of a .layout file.
+    Returns: (grid, allowed_moves, sector_map, dock specs)
+    """
+    sections = {}
+    current = None
+    for raw in text.splitlines():
+        line = raw.rstrip()
+        if not line or line.startswith(";"):
+            continue
+        if line.startswith("[") and line.endswith("]"):
+            current = line[1:-1].strip().lower()
+            sections[current] = []
+        elif current is None:
+            raise ValueError(f"Layout line outside of a section: {line!r}")
+        else:
+            sections[current].append(line)
+
+    for name in ("grid", "moves"):
+        if name not in sections:
+            raise ValueError(f"Layout has no [{name}] section")
+
+    grid = [list(row) for row in sections["grid"]]
+    height = len(grid)
+    width = len(grid[0]) if grid else 0
+    if not width or any(len(row) != width for row in grid):
+        raise ValueError("[grid] rows must all have the same length")
+
+    allowed_moves = {}
+    rows = sections["moves"]
+    _check_shape("moves", rows, width, height)
+    for y, row in enumerate(rows):
+        for x, char in enumerate(row):
+            if char == NO_TILE:
+                continue
+            bits = int(char, 16)
+            allowed_moves[(x, y)] = {move for move, bit in MOVE_BITS.items() if bits & bit}
+
+    sector_map = {}
+    rows = sections.get("sectors")
+    if rows is not None:
+        _check_shape("sectors", rows, width, height)
+        for y, row in enumerate(rows):
+            for x, char in enumerate(row):
+                if char != NO_TILE:
+                    sector_map[(x, y)] = SECTOR_DIGITS.index(char)
+
+    docks = [_parse_dock(line) for line in sections.get("docks", [])]
+    return grid, allowed_moves, sector_map, docks
+
+def _check_shape(name, rows, width, height):
+    if len(rows) != height or any(len(row) != width for row in rows):
+        raise ValueError(f"[{name}] must be {width}x{height} like [grid]")
+
+def _parse_dock(line):
+    tokens = line.split()
+    spec = {"name": tokens[0], "tiles": []}
+    for token in tokens[1:]:
+        if token.startswith("capacity="):
+            spec["capacity"] = int(token.split("=", 1)[1])
+        elif token.startswith("pos="):
+            spec["pos"] = _parse_xy(token.split("=", 1)[1])
+        else:
+            spec["tiles"].append(_parse_xy(token))
+    return spec
+
+def _parse_xy(token):
+    x, y = token.split(",")
+    return (int(x), int(y))
+
+def format_layout(grid, allowed_moves, sector_map=None, docks=()):
+    """The inverse of parse_layout: turns a map into .layout text."""
+    height = len(grid)
+    width = len(grid[0])
+    lines = ["; Warehouse layout (format: see layout.py)", "", "[grid]"]
+    lines += ["".join(row) for row in grid]
+
+    lines += ["", "[moves]"]
+    for y in range(height):
+        row = ""
+        for x in range(width):
+            moves = allowed_moves.get((x, y))
+            row += NO_TILE if moves is None else "%x" % sum(MOVE_BITS[m] for m in moves)
+        lines.append(row)
+
+    if sector_map:
+        if max(sector_map.values()) >= len(SECTOR_DIGITS):
+            raise ValueError(f"At most {len(SECTOR_DIGITS)} sectors fit in a layout file")
+        lines += ["", "[sectors]"]
+        for y in range(height):
+            lines.append("".join(
+                SECTOR_DIGITS[sector_map[(x, y)]] if (x, y) in sector_map else NO_TILE
+                for x in range(width)
+            ))
+
+    if docks:
+        lines += ["", "[docks]"]
+        for i, dock in enumerate(docks):
+            tokens = [dock.get("name") or f"dock{i}"]
+            tokens += ["%d,%d" % tuple(t) for t in dock["tiles"]]
+            if dock.get("capacity") is not None:
+                tokens.append("capacity=%d" % dock["capacity"])
+            if dock.get("pos") is not None:
+                tokens.append("pos=%d,%d" % tuple(dock["pos"]))
+            lines.append(" ".join(tokens))
+    return "\n".join(lines) + "\n"
+
+# ==========================================
+# COMPILED LAYOUT
+# ==========================================
+class CompiledLayout:
+    """
+    Everything the env needs from a layout, backed by flat numpy arrays
+    (indexed [x, y], like the env's traffic map):
+    - moves:     uint8 move bitmask per tile (0 = wall)
+    - walkable:  bool mask of the tiles in allowed_moves
+    - sectors:   int16 sector id per tile (-1 = none)
+    - cells:     (n, 2) walkable tiles in x-major order
+    - distances: int32 (n, n), distances[goal, start] = steps from start to
+                 goal (-1 = unreachable). None for very large sites.
+    When loaded from the cache the distance table is memory-mapped.
+    """
+
+    def __init__(self, grid, moves, walkable, sectors, cells, distances, docks):
+        self.grid = grid
+        self.moves = moves
+        self.walkable = walkable
+        self.sectors = sectors
+        self.cells = cells
+        self.distances = distances
+        self.docks = docks
+        self.width, self.height = moves.shape
+
+        self.allowed_moves = {}
+        for x, y in cells.tolist():
+            bits = int(moves[x, y])
+            self.allowed_moves[(x, y)] = {move for move, bit in MOVE_BITS.items() if bits & bit}
+        # Ordered by (sector, y, x): the same pallet order build_sectors() gives,
+        # so a seed draws the same task list from a layout file
+        xs, ys = np.nonzero(sectors >= 0)
+        self.sector_map = {
+            (int(x), int(y)): int(sectors[x, y])
+            for x, y in sorted(zip(xs, ys), key=lambda c: (sectors[c[0], c[1]], c[1], c[0]))
+        }
+        # Tile -> row/column of the distance table
+        self.cell_index = {tuple(c): i for i, c in enumerate(cells.tolist())}
+        if distances is not None:
+            # pathfinder.distance_field() now reads rows instead of running a BFS
+            register_distance_table(self.allowed_moves, self.distance_field)
+
+    def distance(self, start, goal):
+        """Exact step count from start to goal (None if unreachable)."""
+        if self.distances is None:
+            raise ValueError("This layout is too large for a precomputed distance table")
+        d = int(self.distances[self.cell_index[goal], self.cell_index[start]])
+        return d if d >= 0 else None
+
+    def distance_field(self, goal):
+        """Same dict as pathfinder.distance_field(goal, allowed_moves), read from the table."""
+        row = np.asarray(self.distances[self.cell_index[goal]])
+        reachable = np.nonzero(row >= 0)[0]
+        return dict(zip(map(tuple, self.cells[reachable].tolist()), row[reachable].tolist()))
+
+
+def compile_layout(text):
+    """Parses layout text and precomputes all the arrays (no caching)."""
+    grid, allowed_moves, sector_map, docks = parse_layout(text)
+    height = len(grid)
+    width = len(grid[0])
+
+    moves = np.zeros((width, height), dtype=np.uint8)
+    walkable = np.zeros((width, height), dtype=bool)
+    for (x, y), tile_moves in allowed_moves.items():
+        moves[x, y] = sum(MOVE_BITS[m] for m in tile_moves)
+        walkable[x, y] = True
+    sectors = np.full((width, height), -1, dtype=np.int16)
+    for (x, y), sector in sector_map.items():
+        sectors[x, y] = sector
+
+    cells = np.array(sorted(allowed_moves), dtype=np.int32).reshape(-1, 2)
+    distances = None
+    if len(cells) <= DISTANCE_TABLE_LIMIT:
+        distances = _all_pairs_distances([tuple(c) for c in cells.tolist()], allowed_moves)
+    return CompiledLayout(grid, moves, walkable, sectors, cells, distances, docks)
+
+def _all_pairs_distances(cells, allowed_moves):
+    """One reverse BFS per goal tile over integer ids."""
+    index = {cell: i for i, cell in enumerate(cells)}
+    predecessors = [[] for _ in cells]
+    for (x, y), moves in allowed_moves.items():
+        for dx, dy in moves:
+            j = index.get((x + dx, y + dy))
+            if j is not None:
+                predecessors[j].append(index[(x, y)])
+
+    n = len(cells)
+    table = np.full((n, n), -1, dtype=np.int32)
+    for goal in range(n):
+        dist = [-1] * n
+        dist[goal] = 0
+        frontier = deque([goal])
+        while frontier:
+            current = frontier.popleft()
+            step = dist[current] + 1
+            for prev in predecessors[current]:
+                if dist[prev] < 0:
+                    dist[prev] = step
+                    frontier.append(prev)
+        table[goal] = dist
+    return table
+
+# ==========================================
+# ON-DISK CACHE
+# ==========================================
+# Compiled arrays live in <cache_dir>/v<version>/<sha256 of the file>/ as .npy
+# files, so a worker maps the distance table instead of recomputing it.
+_loaded = {}  # (cache entry dir) -> CompiledLayout, one per process
+
+def default_cache_dir(path):
+    return os.path.join(os.path.dirname(os.path.abspath(path)), ".cache")
+
+def load_layout(path, cache_dir=None):
+    """
+    Compiles a .layout file, or maps its cached compiled form if the file
+    is unchanged. Envs in the same process share one CompiledLayout (and so
+    one allowed_moves dict, which keeps the planner caches warm).
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    cache_dir = cache_dir or default_cache_dir(path)
+    entry = os.path.join(cache_dir, f"v{LAYOUT_CACHE_VERSION}", digest)
+
+    layout = _loaded.get(entry)
+    if layout is not None:
+        return layout
+
+    if os.path.exists(os.path.join(entry, "meta.json")):
+        layout = _read_cache(entry)
+    else:
+        layout = compile_layout(data.decode("utf-8"))
+        _write_cache(entry, layout)
+    _loaded[entry] = layout
+    return layout
+
+def _write_cache(entry, layout):
+    """Writes to a temp folder first, then renames it, so readers never see half a cache."""
+    parent = os.path.dirname(entry)
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    try:
+        np.save(os.path.join(tmp, "moves.npy"), layout.moves)
+        np.save(os.path.join(tmp, "walkable.npy"), layout.walkable)
+        np.save(os.path.join(tmp, "sectors.npy"), layout.sectors)
+        np.save(os.path.join(tmp, "cells.npy"), layout.cells)
+        if layout.distances is not None:
+            np.save(os.path.join(tmp, "distances.npy"), layout.distances)
+        meta = {
+            "version": LAYOUT_CACHE_VERSION,
+            "grid": ["".join(row) for row in layout.grid],
+            "docks": layout.docks,
+        }
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        os.rename(tmp, entry)
+    except OSError:
+        # Another process got there first (or the disk is read-only): keep going uncached
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def _read_cache(entry):
+    with open(os.path.join(entry, "meta.json")) as f:
+        meta = json.load(f)
+    distances_path = os.path.join(entry, "distances.npy")
+    distances = np.load(distances_path, mmap_mode="r") if os.path.exists(distances_path) else None
+    docks = [
+        {**dock, "tiles": [tuple(t) for t in dock["tiles"]],
+         "pos": tuple(dock["pos"]) if dock.get("pos") is not None else None}
+        for dock in meta["docks"]
+    ]
+    return CompiledLayout(
+        [list(row) for row in meta["grid"]],
+        np.load(os.path.join(entry, "moves.npy")),
+        np.load(os.path.join(entry, "walkable.npy")),
+        np.load(os.path.join(entry, "sectors.npy")),
+        np.load(os.path.join(entry, "cells.npy")),
+        distances,
+        docks,
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    from warehouse_map import build_map, build_sectors, WIDTH, HEIGHT
+    from docks import default_docks
+
+    parser = argparse.ArgumentParser(description="Write or compile .layout files.")
+    parser.add_argument("path", help="Layout file")
+    parser.add_argument("--export", action="store_true",
+                        help="Write the built-in map (build_map / build_sectors) to 'path' first")
+    parser.add_argument("--width", type=int, default=WIDTH)
+    parser.add_argument("--height", type=int, default=HEIGHT)
+    args = parser.parse_args()
+
+    if args.export:
+        grid, allowed_moves = build_map(args.width, args.height)
+        shed = default_docks(args.width, args.height, capacity=None)[0]
+        dock = {"name": shed.name, "tiles": shed.tiles, "pos": shed.pos}
+        with open(args.path, "w") as f:
+            f.write(format_layout(grid, allowed_moves, build_sectors(grid), [dock]))
+        print(f"Wrote {args.path}")
+
+    layout = load_layout(args.path)
+    size = layout.distances.nbytes / 1e6 if layout.distances is not None else 0
+    print(f"{args.path}: {layout.width}x{layout.height}, {len(layout.cells)} walkable tiles, "
+          f"{len(set(layout.sector_map.values()))} sectors, {len(layout.docks)} docks, "
+          f"distance table {size:.1f} MB")
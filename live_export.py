@@ -0,0 +1,288 @@
+# live_export.py
+# Live view of a running simulation for external monitors. The env publishes
+# agent positions, states, the head of the task queue and cumulative
+# counters into a double-buffered shared-memory block after every step;
+# monitors attach read-only from another process (python live_export.py NAME).
+import argparse
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+MAGIC = b"WHLX"
+VERSION = 1
+QUEUE_HEAD = 10 # Tasks published from the front of the queue
+
+STATE_CODES = {"IDLE": 0, "MOVE": 1, "WAIT": 2, "LOADING": 3, "TERMINATED": 4}
+STATE_NAMES = {code: name for name, code in STATE_CODES.items()}
+
+# Cumulative since reset(), grouped by the step() phase that produces them
+COUNTERS = (
+    "ticks", "reward",                                    # whole step
+    "dispatches", "tasks_completed",                      # 1. dispatcher
+    "vertex_conflicts", "edge_conflicts", "wait_ticks",   # 2. movement
+    "replans",                                            # planning
+    "agent_ticks",
+)
+# Counters summed from step()'s info dict
+_INFO_SLOTS = [(slot, key) for slot, key in enumerate(COUNTERS) if key not in ("reward", "dispatches")]
+_REWARD_SLOT = COUNTERS.index("reward")
+_DISPATCH_SLOT = COUNTERS.index("dispatches") # Read from the docks instead
+
+# --- MEMORY LAYOUT ---
+# [header][frame 0][frame 1]
+# The writer only ever fills the frame that is NOT 'front', then flips
+# 'front'. Each frame has its own sequence number (odd while being written),
+# so a reader that copies the front frame can tell if the writer lapped it.
+HEADER = np.dtype([
+    ("magic", "S4"), ("version", "<u4"), ("num_agents", "<u4"), ("queue_head", "<u4"),
+    ("width", "<u4"), ("height", "<u4"), ("front", "<u4"), ("closed", "<u4"),
+])
+
+def frame_dtype(num_agents, queue_head=QUEUE_HEAD):
+    return np.dtype([
+        ("seq", "<u8"),
+        ("tick", "<u8"),
+        ("queue_len", "<u4"),
+        ("dock_queue", "<u4"),                   # agents queued for a dock
+        ("counters", "<f8", (len(COUNTERS),)),
+        ("pos", "<i4", (num_agents, 2)),         # phantoms sit at (-100, -100)
+        ("queue", "<i4", (queue_head, 2)),       # (-1, -1) past the end
+        ("state", "u1", (num_agents,)),
+    ])
+
+# Blocks created by a LiveExporter in this process (see LiveReader)
+_created_here = set()
+
+def _views(buf, num_agents, queue_head):
+    header = np.ndarray((), dtype=HEADER, buffer=buf)
+    frames = np.ndarray((2,), dtype=frame_dtype(num_agents, queue_head), buffer=buf, offset=HEADER.itemsize)
+    return header, frames
+
+# ==========================================
+# WRITER (owned by WarehouseEnv)
+# ==========================================
+class LiveExporter:
+    """
+    Creates the shared-memory block 'name' and publishes one frame per
+    publish() call. Runs in the simulator process, so it does no more than
+    fill a few small arrays; nothing waits for readers.
+    """
+
+    def __init__(self, name, num_agents, width, height, queue_head=QUEUE_HEAD):
+        size = HEADER.itemsize + 2 * frame_dtype(num_agents, queue_head).itemsize
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Only take over a block that is closed or is not ours at all;
+            # anything else belongs to an env that is still publishing
+            stale = shared_memory.SharedMemory(name=name)
+            header = np.ndarray((), dtype=HEADER, buffer=stale.buf) if stale.size >= HEADER.itemsize else None
+            in_use = header is not None and bytes(header["magic"]) == MAGIC and not header["closed"]
+            del header
+            stale.close()
+            if in_use:
+                # Attaching registered it with our resource tracker: undo that
+                # unless the live writer is in this process (that entry is its own)
+                if stale.name not in _created_here:
+                    resource_tracker.unregister(stale._name, "shared_memory")
+                raise FileExistsError(
+                    f"live export {name!r} is in use by another env (if its run crashed, "
+                    f"remove /dev/shm/{name} first)"
+                )
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _created_here.add(self.shm.name)
+        self.name = name
+        self.queue_head = queue_head
+        self.header, self.frames = _views(self.shm.buf, num_agents, queue_head)
+        self.frames[...] = np.zeros((), dtype=self.frames.dtype)
+        self.header[()] = (MAGIC, VERSION, num_agents, queue_head, width, height, 0, 0)
+        # Plain per-field views: writing through them is a fraction of the
+        # cost of going through the structured frame every time
+        self.front = self.header["front"]
+        # (scalar fields as length-1 arrays, so they can be assigned through)
+        self.fields = [
+            {field: self.frames[field][b] if self.frames.dtype[field].shape else self.frames[field][b:b + 1]
+             for field in self.frames.dtype.names}
+            for b in (0, 1)
+        ]
+        self.totals = [0.0] * len(COUNTERS)
+
+    def reset(self):
+        self.totals = [0.0] * len(COUNTERS)
+
+    def publish(self, env, info=None, reward=0.0):
+        """Adds this step's counters to the totals and writes a new frame."""
+        totals = self.totals
+        if info is not None:
+            for slot, key in _INFO_SLOTS:
+                totals[slot] += info.get(key, 0)
+            totals[_REWARD_SLOT] += reward
+        totals[_DISPATCH_SLOT] = sum(dock.dispatches for dock in env.docks)
+
+        back = 1 - int(self.front)
+        f = self.fields[back]
+        seq = int(f["seq"][0])
+        f["seq"][0] = seq + 1 # Odd: being written
+        f["tick"][0] = totals[0]
+        f["queue_len"][0] = len(env.task_queue)
+        f["dock_queue"][0] = sum(len(dock.queue) for dock in env.docks)
+        f["counters"][:] = totals
+        f["pos"][:] = [agent.pos for agent in env.agents]
+        f["state"][:] = [STATE_CODES[agent.state] for agent in env.agents]
+        head = env.task_queue[:self.queue_head]
+        f["queue"][len(head):] = -1
+        if head:
+            f["queue"][:len(head)] = head
+        f["seq"][0] = seq + 2
+        self.front[()] = back
+
+    def close(self):
+        self.header["closed"] = 1
+        del self.header, self.frames, self.front, self.fields # Views must go before the buffer can close
+        self.shm.close()
+        self.shm.unlink()
+        _created_here.discard(self.shm.name)
+
+# ==========================================
+# READER
+# ==========================================
+class LiveReader:
+    """Read-only view of a block published by LiveExporter."""
+
+    def __init__(self, name):
+        self.shm = shared_memory.SharedMemory(name=name)
+        # Attaching registers the block with this process' resource tracker,
+        # which would unlink it on exit; the simulator owns it, not us. A block
+        # created in this same process is the writer's registration: leave it
+        if self.shm.name not in _created_here:
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        header = np.ndarray((), dtype=HEADER, buffer=self.shm.buf)
+        if bytes(header["magic"]) != MAGIC or int(header["version"]) != VERSION:
+            raise ValueError(f"{name} is not a live export (version {VERSION})")
+        self.num_agents = int(header["num_agents"])
+        self.width = int(header["width"])
+        self.height = int(header["height"])
+        self.header, self.frames = _views(self.shm.buf, self.num_agents, int(header["queue_head"]))
+
+    @property
+    def closed(self):
+        return bool(self.header["closed"])
+
+    def read(self, retries=100):
+        """
+        Copy of the latest complete frame (a 0-d structured array), or None if
+        the writer kept overwriting it. Never writes to the block.
+        """
+        for _ in range(retries):
+            frame = self.frames[int(self.header["front"])]
+            seq = int(frame["seq"])
+            if seq & 1:
+                continue
+            snapshot = frame.copy()
+            if int(frame["seq"]) == seq:
+                return snapshot
+        return None
+
+    def close(self):
+        del self.header, self.frames
+        self.shm.close()
+
+# ==========================================
+# MONITORS
+# ==========================================
+def format_frame(frame, max_rows=20):
+    counters = dict(zip(COUNTERS, frame["counters"].tolist()))
+    states = np.bincount(frame["state"][frame["pos"][:, 0] > -50], minlength=len(STATE_CODES))
+    lines = [
+        f"tick {int(frame['tick'])}   reward {counters['reward']:.1f}   "
+        f"tasks left {int(frame['queue_len'])}   queued at docks {int(frame['dock_queue'])}",
+        f"dispatcher: {int(counters['dispatches'])} dispatched, {int(counters['tasks_completed'])} completed",
+        f"movement:   {int(counters['vertex_conflicts'])} vertex / {int(counters['edge_conflicts'])} edge conflicts, "
+        f"{int(counters['wait_ticks'])} WAIT ticks",
+        f"planning:   {int(counters['replans'])} replans",
+        "states:     " + "  ".join(f"{STATE_NAMES[c]} {n}" for c, n in enumerate(states.tolist())),
+        "queue head: " + " ".join(f"({x},{y})" for x, y in frame["queue"].tolist() if x >= 0),
+        "",
+        " id   pos        state",
+    ]
+    for i, ((x, y), state) in enumerate(zip(frame["pos"].tolist(), frame["state"].tolist())):
+        if i >= max_rows:
+            lines.append(f" ... {len(frame['state']) - max_rows} more")
+            break
+        if x > -50:
+            lines.append(f"{i:3d}   ({x:3d},{y:3d})  {STATE_NAMES[state]}")
+    return "\n".join(lines)
+
+def run_terminal(reader, hz, max_rows):
+    while not reader.closed:
+        frame = reader.read()
+        if frame is not None:
+            print("\033[H\033[J" + format_frame(frame, max_rows), flush=True)
+        time.sleep(1 / hz)
+
+def run_pygame(reader, hz, layout=None):
+    import pygame
+    from warehouse_map import build_map, WIDTH, HEIGHT, CELL_SIZE
+    from visualizer import draw_grid
+    from warehouse_env import AGENT_COLORS
+
+    grid = allowed_moves = None
+    if layout is not None:
+        from layout import load_layout
+        compiled = load_layout(layout)
+        grid, allowed_moves = compiled.grid, compiled.allowed_moves
+    elif (reader.width, reader.height) == (WIDTH, HEIGHT):
+        grid, allowed_moves = build_map()
+
+    pygame.init()
+    screen = pygame.display.set_mode((reader.width * CELL_SIZE, reader.height * CELL_SIZE + 60))
+    pygame.display.set_caption("Warehouse Live Monitor")
+    font = pygame.font.SysFont(None, 20)
+    clock = pygame.time.Clock()
+    half = CELL_SIZE // 2
+    while not reader.closed:
+        if any(event.type == pygame.QUIT for event in pygame.event.get()):
+            break
+        frame = reader.read()
+        if frame is None:
+            continue
+        screen.fill((30, 30, 30))
+        if grid is not None:
+            draw_grid(screen, grid, allowed_moves)
+        for x, y in frame["queue"].tolist():
+            if x >= 0:
+                pygame.draw.rect(screen, (255, 255, 255), (x * CELL_SIZE + half - 4, y * CELL_SIZE + half - 4, 10, 10))
+        for i, ((x, y), state) in enumerate(zip(frame["pos"].tolist(), frame["state"].tolist())):
+            if x < -50: continue # Phantom
+            center = (x * CELL_SIZE + half, y * CELL_SIZE + half)
+            pygame.draw.circle(screen, AGENT_COLORS[i % len(AGENT_COLORS)], center, CELL_SIZE // 3)
+            if STATE_NAMES[state] == "WAIT":
+                pygame.draw.circle(screen, (255, 255, 0), center, CELL_SIZE // 3, 2)
+        for row, text in enumerate(format_frame(frame, max_rows=0).splitlines()[:3]):
+            screen.blit(font.render(text, True, (230, 230, 230)), (6, reader.height * CELL_SIZE + 4 + row * 18))
+        pygame.display.flip()
+        clock.tick(hz)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read-only monitor for WarehouseEnv(export_shm=NAME).")
+    parser.add_argument("name", help="Shared-memory name given to the env")
+    parser.add_argument("--pygame", action="store_true", help="Draw the map instead of printing")
+    parser.add_argument("--layout", default=None, help=".layout file the env runs on (pygame map)")
+    parser.add_argument("--hz", type=float, default=5.0, help="Refresh rate")
+    parser.add_argument("--rows", type=int, default=20, help="Agents listed in the terminal view")
+    args = parser.parse_args()
+
+    reader = LiveReader(args.name)
+    try:
+        if args.pygame:
+            run_pygame(reader, args.hz, args.layout)
+        else:
+            run_terminal(reader, args.hz, args.rows)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
@@ -1,5 +1,14 @@
 # pathfinder.py
 import heapq
+from collections import defaultdict, deque
+import numpy as np
+
+# Optional: Numba compiles the array-backed A* kernel when it is installed
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
 
 class PriorityQueue:
     def __init__(self):
@@ -20,10 +29,12 @@ def heuristic(a, b):
     (x2, y2) = b
     return abs(x1 - x2) + abs(y1 - y2)
 
-def a_star_search(start, goal, allowed_moves, obstacles=None):
+def a_star_search(start, goal, allowed_moves, obstacles=None, cell_costs=None):
     """
     Standard A* but accepts a set of 'obstacles' (coordinates) 
     that should be treated as walls for this specific search.
+    cell_costs (optional, array indexed [x, y]) adds an extra cost >= 0 for
+    stepping ONTO each tile, e.g. the env's traffic heatmap.
     """
     if obstacles is None:
         obstacles = set()
@@ -62,6 +73,8 @@ def a_star_search(start, goal, allowed_moves, obstacles=None):
                 continue
 
             new_cost = cost_so_far[current] + 1
+            if cell_costs is not None:
+                new_cost += cell_costs[next_node]
             if next_node not in cost_so_far or new_cost < cost_so_far[next_node]:
                 cost_so_far[next_node] = new_cost
                 priority = new_cost + heuristic(next_node, goal)
@@ -80,4 +93,375 @@ def a_star_search(start, goal, allowed_moves, obstacles=None):
     path.append(start)
     path.reverse()
     
-    return path
\ No newline at end of file
+    return path
+
+# ==========================================
+# ARRAY-BACKED A* (Flat Grid + Generation Counters)
+# ==========================================
+# Same search as a_star_search, but over integer cell ids with preallocated
+# cost/parent arrays. Numba compiles the inner loop when it is installed;
+# otherwise a pure Python version over plain lists is used.
+# Step costs are integers: 'step' holds the cost of entering each cell and
+# 'scale' the cost of a plain step (1 unless cell_costs are quantized).
+
+# Fixed-point resolution for cell_costs in the array planner (0.1 steps)
+COST_SCALE = 10
+
+def _python_kernel(neighbors, height, start, goal, g, parent, seen, blocked, gen, step, scale):
+    n = len(g)
+    goal_x, goal_y = divmod(goal, height)
+
+    seen[start] = gen
+    g[start] = 0
+    parent[start] = -1
+
+    # Heap keys are 'priority * n + cell'. Cells are numbered x * height + y, so
+    # ties break exactly like the (priority, (x, y)) tuples of a_star_search.
+    frontier = [start]
+    while frontier:
+        current = heapq.heappop(frontier) % n
+        if current == goal:
+            return True
+
+        for next_node in neighbors[current]:
+            if blocked[next_node] == gen:
+                continue # Dynamic obstacle for this search only
+            new_cost = g[current] + step[next_node]
+            if seen[next_node] != gen or new_cost < g[next_node]:
+                seen[next_node] = gen
+                g[next_node] = new_cost
+                parent[next_node] = current
+                nx, ny = divmod(next_node, height)
+                priority = new_cost + scale * (abs(nx - goal_x) + abs(ny - goal_y))
+                heapq.heappush(frontier, priority * n + next_node)
+    return False
+
+
+def _numba_kernel(neighbors, height, start, goal, g, parent, seen, blocked, gen, step, scale, heap):
+    n = g.shape[0]
+    goal_x = goal // height
+    goal_y = goal % height
+
+    seen[start] = gen
+    g[start] = 0
+    parent[start] = -1
+
+    heap[0] = start
+    size = 1
+    while size > 0:
+        # --- POP (binary heap on a flat int64 array) ---
+        key = heap[0]
+        size -= 1
+        if size > 0:
+            last = heap[size]
+            i = 0
+            while True:
+                child = 2 * i + 1
+                if child >= size:
+                    break
+                if child + 1 < size and heap[child + 1] < heap[child]:
+                    child += 1
+                if heap[child] >= last:
+                    break
+                heap[i] = heap[child]
+                i = child
+            heap[i] = last
+
+        current = key % n
+        if current == goal:
+            return True
+
+        for k in range(neighbors.shape[1]):
+            next_node = neighbors[current, k]
+            if next_node < 0:
+                break
+            if blocked[next_node] == gen:
+                continue
+            new_cost = g[current] + step[next_node]
+            if seen[next_node] != gen or new_cost < g[next_node]:
+                seen[next_node] = gen
+                g[next_node] = new_cost
+                parent[next_node] = current
+                nx = next_node // height
+                ny = next_node % height
+                priority = new_cost + scale * (abs(nx - goal_x) + abs(ny - goal_y))
+
+                # --- PUSH ---
+                i = size
+                size += 1
+                new_key = priority * n + next_node
+                while i > 0:
+                    up = (i - 1) // 2
+                    if heap[up] <= new_key:
+                        break
+                    heap[i] = heap[up]
+                    i = up
+                heap[i] = new_key
+    return False
+
+
+def _numba_trace(parent, goal, out):
+    # Walk the parent links back from the goal; returns the path length
+    length = 0
+    curr = goal
+    while curr != -1:
+        out[length] = curr
+        length += 1
+        curr = parent[curr]
+    return length
+
+
+if HAS_NUMBA:
+    _numba_kernel = njit(cache=True)(_numba_kernel)
+    _numba_trace = njit(cache=True)(_numba_trace)
+
+
+class GridGraph:
+    """
+    allowed_moves compiled into a flat int grid (cell id = x * height + y).
+    The cost/parent arrays are allocated once; each search bumps a generation
+    counter instead of clearing them, so old entries simply count as unseen.
+    """
+
+    def __init__(self, allowed_moves, use_numba=HAS_NUMBA):
+        self.width = max(x for x, _ in allowed_moves) + 1
+        self.height = max(y for _, y in allowed_moves) + 1
+        self.use_numba = use_numba and HAS_NUMBA
+        n = self.width * self.height
+
+        self.neighbors = np.full((n, 4), -1, dtype=np.int64)
+        for (x, y), moves in allowed_moves.items():
+            k = 0
+            for dx, dy in sorted(moves):
+                next_node = (x + dx, y + dy)
+                if next_node in allowed_moves:
+                    self.neighbors[x * self.height + y, k] = self.index(next_node)
+                    k += 1
+
+        self.generation = 0
+        if self.use_numba:
+            self.g = np.zeros(n, dtype=np.int64)
+            self.parent = np.full(n, -1, dtype=np.int64)
+            self.seen = np.zeros(n, dtype=np.int64)
+            self.blocked = np.zeros(n, dtype=np.int64)
+            self.unit_step = np.ones(n, dtype=np.int64)
+            # Every cell can be improved at most once per incoming edge
+            self.heap = np.zeros(4 * n + 1, dtype=np.int64)
+            self.trace = np.zeros(n, dtype=np.int64)
+        else:
+            # Plain lists are much faster than numpy arrays for scalar access
+            self.neighbor_lists = [tuple(int(v) for v in row if v >= 0) for row in self.neighbors]
+            self.g = [0] * n
+            self.parent = [-1] * n
+            self.seen = [0] * n
+            self.blocked = [0] * n
+            self.unit_step = [1] * n
+
+    def index(self, pos):
+        x, y = pos
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return x * self.height + y
+        return None
+
+    def step_costs(self, cell_costs):
+        """
+        Quantizes cell_costs (array indexed [x, y]) into integer entry costs
+        in units of 1 / COST_SCALE steps.
+        """
+        extra = np.asarray(cell_costs, dtype=np.float64)[:self.width, :self.height]
+        step = COST_SCALE + np.rint(extra * COST_SCALE).astype(np.int64).ravel()
+        return step if self.use_numba else step.tolist()
+
+    def search(self, start, goal, obstacles=None, cell_costs=None):
+        if start == goal:
+            return [start]
+        start_id = self.index(start)
+        goal_id = self.index(goal)
+        if start_id is None or goal_id is None:
+            return []
+
+        self.generation += 1
+        gen = self.generation
+        if obstacles:
+            for obstacle in obstacles:
+                obstacle_id = self.index(obstacle)
+                if obstacle_id is not None:
+                    self.blocked[obstacle_id] = gen
+
+        if cell_costs is None:
+            step, scale = self.unit_step, 1
+        else:
+            step, scale = self.step_costs(cell_costs), COST_SCALE
+
+        height = self.height
+        if self.use_numba:
+            found = _numba_kernel(self.neighbors, height, start_id, goal_id, self.g, self.parent,
+                                  self.seen, self.blocked, gen, step, scale, self.heap)
+            if not found:
+                return [] # No path found
+            length = _numba_trace(self.parent, goal_id, self.trace)
+            return [divmod(cell, height) for cell in self.trace[length - 1::-1].tolist()]
+
+        found = _python_kernel(self.neighbor_lists, height, start_id, goal_id, self.g,
+                               self.parent, self.seen, self.blocked, gen, step, scale)
+        if not found:
+            return [] # No path found
+
+        # Reconstruct path
+        path = []
+        curr = goal_id
+        parent = self.parent
+        while curr != -1:
+            path.append(divmod(curr, height))
+            curr = parent[curr]
+        path.reverse()
+        return path
+
+
+# One compiled graph per allowed_moves dict (the map never changes during a run).
+# The dict itself is kept alive in the cache so its id() cannot be recycled.
+# Bounded like _field_cache, so long runs that build many envs do not pin them all.
+GRAPH_CACHE_SIZE = 512
+_graph_cache = {}
+
+def get_grid_graph(allowed_moves):
+    entry = _graph_cache.get(id(allowed_moves))
+    if entry is None or entry[0] is not allowed_moves:
+        entry = (allowed_moves, GridGraph(allowed_moves))
+        if len(_graph_cache) >= GRAPH_CACHE_SIZE:
+            _graph_cache.pop(next(iter(_graph_cache))) # Drop the oldest graph
+        _graph_cache[id(allowed_moves)] = entry
+    return entry[1]
+
+def array_a_star_search(start, goal, allowed_moves, obstacles=None, cell_costs=None):
+    """
+    Drop-in replacement for a_star_search backed by GridGraph.
+    Returns the same paths, including tie-breaking (cell_costs are rounded
+    to 1 / COST_SCALE, so weighted paths may differ on near-ties).
+    """
+    return get_grid_graph(allowed_moves).search(start, goal, obstacles, cell_costs)
+
+
+# ==========================================
+# BATCHED MULTI-QUERY PLANNING
+# ==========================================
+
+# Distance fields per (allowed_moves, goal). Shed tiles and popular pallets are
+# asked for over and over, so keep a bounded number of them around.
+FIELD_CACHE_SIZE = 512
+_field_cache = {}
+
+# Precomputed all-pairs tables (see layout.py), one lookup per allowed_moves dict
+_distance_tables = {}
+
+def register_distance_table(allowed_moves, lookup):
+    """
+    Lets distance_field() answer from a precomputed table for this map.
+    'lookup(goal)' must return the same dict the BFS would.
+    """
+    _distance_tables[id(allowed_moves)] = (allowed_moves, lookup)
+
+def distance_field(goal, allowed_moves):
+    """
+    Exact step count from EVERY tile to 'goal' (reverse BFS over the one-way
+    moves). Tiles that cannot reach the goal are missing from the dict.
+    """
+    key = (id(allowed_moves), goal)
+    entry = _field_cache.get(key)
+    if entry is not None and entry[0] is allowed_moves:
+        return entry[1]
+
+    table = _distance_tables.get(id(allowed_moves))
+    if table is not None and table[0] is allowed_moves:
+        field = table[1](goal)
+        _remember_field(key, allowed_moves, field)
+        return field
+
+    # Reverse graph: who can step INTO each tile?
+    predecessors = defaultdict(list)
+    for (x, y), moves in allowed_moves.items():
+        for dx, dy in moves:
+            next_node = (x + dx, y + dy)
+            if next_node in allowed_moves:
+                predecessors[next_node].append((x, y))
+
+    field = {goal: 0}
+    frontier = deque([goal])
+    while frontier:
+        current = frontier.popleft()
+        for prev in predecessors[current]:
+            if prev not in field:
+                field[prev] = field[current] + 1
+                frontier.append(prev)
+
+    _remember_field(key, allowed_moves, field)
+    return field
+
+def _remember_field(key, allowed_moves, field):
+    if len(_field_cache) >= FIELD_CACHE_SIZE:
+        _field_cache.pop(next(iter(_field_cache))) # Drop the oldest field
+    _field_cache[key] = (allowed_moves, field)
+
+def path_from_field(start, field, allowed_moves):
+    """
+    Walk downhill on a distance field. Always a shortest path; among equal
+    choices the first move in sorted order wins.
+    """
+    if start not in field:
+        return []
+    path = [start]
+    current = start
+    while field[current] > 0:
+        for dx, dy in sorted(allowed_moves.get(current, ())):
+            next_node = (current[0] + dx, current[1] + dy)
+            if field.get(next_node) == field[current] - 1:
+                current = next_node
+                break
+        path.append(current)
+    return path
+
+def a_star_batch(queries, allowed_moves, search=a_star_search, cell_costs=None):
+    """
+    Solves a list of (start, goal, obstacles) queries in one call and returns
+    the paths in the same order.
+    - Identical queries are only solved once.
+    - Obstacle-free queries that share a goal (both shed tiles, a repeated
+      pallet) all walk down ONE shared, cached distance field.
+    - Everything else goes to 'search' (any a_star_search compatible planner).
+    With cell_costs the distance fields no longer match the weighted costs,
+    so every unique query is searched with them instead.
+    """
+    solved = {}
+    by_goal = defaultdict(set)
+    for start, goal, obstacles in queries:
+        if not obstacles and cell_costs is None:
+            by_goal[goal].add(start)
+
+    for start, goal, obstacles in queries:
+        key = (start, goal, frozenset(obstacles) if obstacles else None)
+        if key in solved:
+            continue
+
+        if cell_costs is not None:
+            solved[key] = search(start, goal, allowed_moves, obstacles, cell_costs=cell_costs)
+            continue
+
+        shared = not obstacles and (
+            len(by_goal[goal]) > 1 or (id(allowed_moves), goal) in _field_cache
+        )
+        if shared:
+            solved[key] = path_from_field(start, distance_field(goal, allowed_moves), allowed_moves)
+        else:
+            solved[key] = search(start, goal, allowed_moves, obstacles)
+
+    return [
+        list(solved[(start, goal, frozenset(obstacles) if obstacles else None)])
+        for start, goal, obstacles in queries
+    ]
+
+
+# Planner names accepted by WarehouseEnv(planner=...)
+PLANNERS = {
+    "astar": a_star_search,
+    "array": array_a_star_search,
+}
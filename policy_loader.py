@@ -0,0 +1,85 @@
+# policy_loader.py
+import os
+import pickle
+
+import numpy as np
+import torch
+import torch.multiprocessing # Registers shared-memory pickling for torch tensors
+from stable_baselines3 import PPO
+
+# ==========================================
+# PER-PROCESS MODEL CACHE
+# ==========================================
+_models = {}
+
+def load_model(path, env=None):
+    """
+    PPO.load, but only once per process: later calls with the same path return
+    the cached model. Pass 'env' only if you want to keep training it.
+    """
+    key = os.path.abspath(path)
+    if key not in _models:
+        _models[key] = PPO.load(path, device="cpu")
+    model = _models[key]
+    if env is not None:
+        model.set_env(env)
+    return model
+
+def normalizer_path(model_path):
+    """train.py saves a model's VecNormalize statistics next to it, under this name."""
+    base = model_path[:-len(".zip")] if model_path.endswith(".zip") else model_path
+    return base + "_vecnormalize.pkl"
+
+# ==========================================
+# SHARED WEIGHTS FOR WORKER POOLS
+# ==========================================
+class SharedPolicy:
+    """
+    Inference-only copy of a saved policy whose weights live in SHARED MEMORY.
+    Load it once in the parent and hand it to the pool initializer: forked
+    workers inherit it, spawned workers receive shared-memory handles instead
+    of a copy of the weights. Either way the zip is read from disk only once.
+    """
+
+    def __init__(self, path):
+        model = load_model(path)
+        # A fresh policy object, so the (possibly large) optimizer state of the
+        # cached model is not dragged into the workers
+        self.policy = model.policy.__class__(**model.policy._get_constructor_parameters())
+        self.policy.load_state_dict(model.policy.state_dict())
+        self.policy.set_training_mode(False)
+        self.policy.share_memory()
+        self.path = path
+
+        # Trained with normalize on? Then it expects the same observation scaling
+        # (only the statistics are kept: a loaded VecNormalize cannot be re-pickled)
+        self.obs_rms = None
+        if os.path.exists(normalizer_path(path)):
+            with open(normalizer_path(path), "rb") as f:
+                normalizer = pickle.load(f)
+            if normalizer.norm_obs:
+                self.obs_rms = normalizer.obs_rms
+                self.clip_obs = normalizer.clip_obs
+                self.epsilon = normalizer.epsilon
+
+    def normalize_obs(self, obs):
+        """VecNormalize.normalize_obs with the training statistics (as is without them)."""
+        if self.obs_rms is None:
+            return obs
+        scaled = (obs - self.obs_rms.mean) / np.sqrt(self.obs_rms.var + self.epsilon)
+        return np.clip(scaled, -self.clip_obs, self.clip_obs).astype(np.float32)
+
+    def predict(self, obs, deterministic=True):
+        return self.policy.predict(self.normalize_obs(obs), deterministic=deterministic)
+
+# --- Worker side ---
+_worker_policy = None
+
+def init_worker(shared_policy=None):
+    """Pool initializer: keep the shared policy and use one torch thread per worker."""
+    global _worker_policy
+    torch.set_num_threads(1)
+    _worker_policy = shared_policy
+
+def worker_policy():
+    return _worker_policy
@@ -0,0 +1,164 @@
+# rollout_dispatcher.py
+import os
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from warehouse_env import WarehouseEnv
+
+# ==========================================
+# WORKER SIDE
+# ==========================================
+# Every worker process builds ONE env at start-up and re-uses it for all rollouts.
+# Only the state blob (a few KB) travels between processes.
+_worker_env = None
+
+def _init_worker(sim_config):
+    global _worker_env
+    _worker_env = WarehouseEnv(render_mode=None, **sim_config)
+
+def _rollout(blob, action, horizon, seed, deadline=None):
+    """
+    Fork the live state, take 'action' now and then follow the FIFO base policy
+    (always action 0) for the rest of the horizon, or until 'deadline' (time.time()).
+    Returns the accumulated reward after each step taken.
+    """
+    env = _worker_env
+    env.set_state(blob)
+    if seed is not None:
+        env.rng.seed(seed) # A different future for each Monte-Carlo sample
+
+    _, total_reward, terminated, _, _ = env.step(action)
+    totals = [total_reward]
+    for _ in range(horizon - 1):
+        if terminated:
+            break
+        if deadline is not None and time.time() > deadline:
+            break
+        _, reward, terminated, _, _ = env.step(0)
+        total_reward += reward
+        totals.append(total_reward)
+    if terminated:
+        # The shift is over: the score stays put for any longer comparison
+        totals += [total_reward] * (horizon - len(totals))
+
+    return action, totals
+
+# ==========================================
+# DISPATCHER
+# ==========================================
+class RolloutDispatcher:
+    """
+    LOOKAHEAD DISPATCHER: At every real dispatch decision, each candidate action
+    (one of the next 3 tasks) is simulated for 'horizon' steps from a fork of
+    the current state, in parallel over a process pool. The action with the best
+    accumulated reward wins.
+
+    The workers simulate env.sim_config of the env passed to predict() (the
+    pool restarts if a later env has other settings). With time_budget (seconds
+    per decision), rollouts stop early when it runs out and all candidates are
+    compared over the steps every rollout got through.
+
+    Works as a standalone baseline or as a teacher for imitation data.
+    """
+
+    def __init__(self, horizon=50, rollouts_per_action=1, n_workers=None, seed=None, time_budget=None):
+        self.horizon = horizon
+        self.rollouts_per_action = rollouts_per_action
+        self.n_workers = n_workers or os.cpu_count()
+        self.rng = random.Random(seed)
+        self.time_budget = time_budget
+        self.executor = None
+        self.sim_config = None # What the pool's worker envs were built with
+
+    def predict(self, env):
+        """
+        Returns the action for the next env.step(). Steps that do not dispatch
+        anything are answered instantly with action 0.
+        """
+        if not env.needs_dispatch():
+            return 0
+
+        candidates = list(range(min(env.action_space.n, len(env.task_queue))))
+        if len(candidates) == 1:
+            return 0
+
+        if self.executor is not None and self.sim_config != env.sim_config:
+            self.close()
+        if self.executor is None:
+            self.sim_config = env.sim_config
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.n_workers,
+                initializer=_init_worker,
+                initargs=(self.sim_config,)
+            )
+
+        # With one sample the env's own RNG plays out the exact future.
+        # With more, every action is scored on the SAME seeds (common random numbers).
+        if self.rollouts_per_action == 1:
+            seeds = [None]
+        else:
+            seeds = [self.rng.randrange(2**31) for _ in range(self.rollouts_per_action)]
+
+        deadline = time.time() + self.time_budget if self.time_budget is not None else None
+        blob = env.get_state()
+        futures = [
+            self.executor.submit(_rollout, blob, action, self.horizon, seed, deadline)
+            for action in candidates
+            for seed in seeds
+        ]
+        results = [future.result() for future in futures]
+
+        # Same number of steps for everyone (all of them without a time budget)
+        steps = min(len(totals) for _, totals in results)
+        scores = defaultdict(float)
+        for action, totals in results:
+            scores[action] += totals[steps - 1]
+
+        # Best score wins, ties go to the task closest to the head of the queue
+        return max(candidates, key=lambda a: (scores[a], -a))
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ==========================================
+# STANDALONE BASELINE
+# ==========================================
+if __name__ == "__main__":
+    env = WarehouseEnv(render_mode=None, num_agents=4, active_agents=4)
+    env.reset(seed=0)
+
+    decision_times = []
+    total_reward = 0
+    steps = 0
+    terminated = False
+
+    with RolloutDispatcher(horizon=50) as dispatcher:
+        while not terminated and steps < 5000:
+            is_decision = env.needs_dispatch()
+            start = time.perf_counter()
+            action = dispatcher.predict(env)
+            if is_decision:
+                decision_times.append(time.perf_counter() - start)
+
+            _, reward, terminated, _, _ = env.step(action)
+            total_reward += reward
+            steps += 1
+
+    print("---------------------------------------")
+    print(f"Steps:            {steps} (finished: {terminated})")
+    print(f"Tasks left:       {len(env.task_queue)}")
+    print(f"Total reward:     {total_reward:.1f}")
+    if decision_times:
+        print(f"Decisions:        {len(decision_times)}")
+        print(f"Mean latency:     {1000 * sum(decision_times) / len(decision_times):.1f} ms")
+    print("---------------------------------------")
@@ -0,0 +1,159 @@
+# telemetry.py
+import csv
+import json
+import os
+import time
+
+from stable_baselines3.common.callbacks import BaseCallback
+
+# Per-tick counters that WarehouseEnv.step() reports in its 'info' dict
+ENV_COUNTERS = ["tasks_completed", "wait_ticks", "agent_ticks", "replans", "vertex_conflicts", "edge_conflicts"]
+
+class MetricsSink:
+    """
+    Appends metric records (flat dicts) to a LOCAL file.
+    The format follows the extension: '.csv' or '.jsonl'.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.is_csv = path.endswith(".csv")
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.file = open(path, mode="a", newline="")
+        self.writer = None
+
+    def write(self, record):
+        if self.is_csv:
+            if self.writer is None:
+                # Columns are fixed by the first record
+                self.writer = csv.DictWriter(self.file, fieldnames=list(record), extrasaction="ignore")
+                if self.file.tell() == 0:
+                    self.writer.writeheader()
+            self.writer.writerow(record)
+        else:
+            self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class TelemetryCallback(BaseCallback):
+    """
+    THROUGHPUT TELEMETRY for one curriculum stage.
+    Writes two files into 'log_dir':
+    - rollouts.<fmt>: env FPS, rollout vs. PPO update vs. checkpoint save
+      time, task/WAIT/replan totals
+    - episodes.<fmt>: one line per finished episode
+    'checkpoint' is the run's CurriculumCheckpoint; it has to come before
+    this callback in the CallbackList, so its saves land between our
+    rollout_end and rollout_start and can be taken out of the update time.
+    """
+
+    def __init__(self, stage, log_dir="logs/telemetry", fmt="jsonl", checkpoint=None, verbose=0):
+        super().__init__(verbose)
+        self.stage = stage
+        self.log_dir = log_dir
+        self.fmt = fmt
+        self.checkpoint = checkpoint
+        self.rollout_sink = None
+        self.episode_sink = None
+
+    def _on_training_start(self):
+        self.rollout_sink = MetricsSink(os.path.join(self.log_dir, f"rollouts.{self.fmt}"))
+        self.episode_sink = MetricsSink(os.path.join(self.log_dir, f"episodes.{self.fmt}"))
+
+        n_envs = self.training_env.num_envs
+        self.episode_totals = [self._empty_totals() for _ in range(n_envs)]
+        self.episode_count = 0
+        self.pending = None          # Last rollout, waiting for its PPO update time
+        self.rollout_index = 0
+        self.rollout_start_time = None
+
+    def _empty_totals(self):
+        totals = {name: 0 for name in ENV_COUNTERS}
+        totals["ticks"] = 0
+        totals["reward"] = 0.0
+        return totals
+
+    def _on_rollout_start(self):
+        now = time.perf_counter()
+        self._flush_pending(now)
+        self.rollout_start_time = now
+        self.rollout_start_steps = self.num_timesteps
+        self.rollout_totals = {name: 0 for name in ENV_COUNTERS}
+
+    def _on_step(self):
+        infos = self.locals["infos"]
+        rewards = self.locals["rewards"]
+        dones = self.locals["dones"]
+
+        for i, info in enumerate(infos):
+            totals = self.episode_totals[i]
+            for name in ENV_COUNTERS:
+                value = info.get(name, 0)
+                totals[name] += value
+                self.rollout_totals[name] += value
+            totals["ticks"] += info.get("ticks", 1) # Event-driven steps skip ticks
+            totals["reward"] += float(rewards[i])
+
+            if dones[i]:
+                self.episode_count += 1
+                self.episode_sink.write({
+                    "stage": self.stage,
+                    "episode": self.episode_count,
+                    "timesteps": self.num_timesteps,
+                    "ticks": totals["ticks"],
+                    "reward": round(totals["reward"], 3),
+                    **{name: totals[name] for name in ENV_COUNTERS},
+                    "wait_ratio": round(totals["wait_ticks"] / max(totals["agent_ticks"], 1), 4),
+                })
+                self.episode_totals[i] = self._empty_totals()
+        return True
+
+    def _on_rollout_end(self):
+        now = time.perf_counter()
+        rollout_time = now - self.rollout_start_time
+        steps = self.num_timesteps - self.rollout_start_steps
+        totals = self.rollout_totals
+
+        self.rollout_index += 1
+        self.pending = {
+            "stage": self.stage,
+            "rollout": self.rollout_index,
+            "timesteps": self.num_timesteps,
+            "env_steps": steps,
+            "rollout_time_s": round(rollout_time, 4),
+            "update_time_s": None,
+            "checkpoint_time_s": None,
+            "env_fps": round(steps / rollout_time, 1) if rollout_time > 0 else None,
+            **totals,
+            "wait_ratio": round(totals["wait_ticks"] / max(totals["agent_ticks"], 1), 4),
+        }
+        self.rollout_end_time = now
+        self.rollout_end_save_time = self._save_time()
+
+    def _save_time(self):
+        return self.checkpoint.save_time if self.checkpoint is not None else 0.0
+
+    def _flush_pending(self, now):
+        # The PPO update (and any checkpoint save) runs between rollout_end
+        # and the next rollout_start
+        if self.pending is None:
+            return
+        saving = self._save_time() - self.rollout_end_save_time
+        self.pending["update_time_s"] = round(now - self.rollout_end_time - saving, 4)
+        self.pending["checkpoint_time_s"] = round(saving, 4)
+        self.rollout_sink.write(self.pending)
+        if self.verbose:
+            print(f"[TELEMETRY] {self.stage} rollout {self.pending['rollout']}: "
+                  f"{self.pending['env_fps']} env FPS, update {self.pending['update_time_s']}s, "
+                  f"checkpoint {self.pending['checkpoint_time_s']}s")
+        self.pending = None
+
+    def _on_training_end(self):
+        self._flush_pending(time.perf_counter())
+        self.rollout_sink.close()
+        self.episode_sink.close()
@@ -1,12 +1,14 @@
+import argparse
 import pygame
 import sys
-from stable_baselines3 import PPO
+from policy_loader import load_model
+from inference_server import PolicyClient
 from warehouse_env import WarehouseEnv
 # We import CELL_SIZE from the map (Source of Truth) to calculate clicks.
 # This keeps visualizer.py clean.
 from warehouse_map import CELL_SIZE 
 
-def run_interactive_simulation():
+def run_interactive_simulation(server=None):
     # 1. Load the Environment
     # render_mode="human" tells the Env to initialize Pygame window
     env = WarehouseEnv(render_mode="human", num_agents=4)
@@ -16,10 +18,15 @@ def run_interactive_simulation():
     model = None
 
     try:
-        model = PPO.load(model_path)
-        print(f"Successfully loaded model from {model_path}")
-    except FileNotFoundError:
-        print(f"WARNING: Could not find model at {model_path}")
+        if server:
+            # Ask a shared policy process (inference_server.py) instead of loading the model here
+            model = PolicyClient(server)
+            print(f"Connected to policy server at {server}")
+        else:
+            model = load_model(model_path)
+            print(f"Successfully loaded model from {model_path}")
+    except (FileNotFoundError, ConnectionError):
+        print(f"WARNING: Could not reach {server or model_path}")
         print("Running in RANDOM mode (Agents will pick random tasks).")
 
     # 3. Simulation Setup
@@ -91,4 +98,8 @@ def run_interactive_simulation():
     sys.exit()
 
 if __name__ == "__main__":
-    run_interactive_simulation()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Live warehouse simulation.")
+    parser.add_argument("--server", default=None,
+                        help="Use a running inference_server.py (socket path or port) instead of loading the model")
+    args = parser.parse_args()
+    run_interactive_simulation(server=args.server)
\ No newline at end of file
@@ -0,0 +1,7 @@
+# conftest.py
+# The modules live flat in the repo root: make them importable from tests/.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
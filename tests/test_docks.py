@@ -0,0 +1,33 @@
+# test_docks.py
+from warehouse_env import WarehouseEnv
+
+# The classic Shed, but only one agent may stand on it at a time
+SINGLE_SLOT_SHED = [{"tiles": [[13, 16], [14, 16]], "capacity": 1, "name": "shed"}]
+
+def test_parked_agents_hold_no_slot():
+    env = WarehouseEnv(num_agents=4, docks=SINGLE_SLOT_SHED)
+    env.reset(seed=0)
+    parked = env.agents[0]
+    parked.pos, parked.state = (13, 16), "TERMINATED"
+
+    assert env._dock_occupants() == [0]
+    assert env.docks[0].has_room(env._dock_occupants()[0])
+
+def test_single_slot_dock_serves_the_whole_shift():
+    env = WarehouseEnv(num_agents=4, docks=SINGLE_SLOT_SHED)
+    env.reset(seed=1)
+    dock_tiles = set(env.docks[0].tiles)
+
+    terminated = False
+    for _ in range(6000):
+        _, _, terminated, _, _ = env.step(0)
+        working = [a for a in env.agents if a.pos in dock_tiles and a.state != "TERMINATED"]
+        assert len(working) <= 1
+        if terminated:
+            break
+
+    assert terminated
+    assert not env.task_queue
+    # More agents than slots went through the dock, and all of them ended the shift there
+    assert env.docks[0].dispatches > 1
+    assert all(a.state == "TERMINATED" for a in env.agents)
@@ -0,0 +1,28 @@
+# test_live_export.py
+import pytest
+
+import live_export
+from live_export import LiveExporter, LiveReader
+
+def test_live_block_is_not_taken_over_in_the_same_process(monkeypatch):
+    unregistered = []
+    monkeypatch.setattr(live_export.resource_tracker, "unregister",
+                        lambda name, rtype: unregistered.append(name))
+    writer = LiveExporter("whlx_pytest_refuse", 4, 28, 18)
+    try:
+        with pytest.raises(FileExistsError):
+            LiveExporter("whlx_pytest_refuse", 4, 28, 18)
+        LiveReader("whlx_pytest_refuse").close()
+        # The tracker entry is the writer's own: it still has to unlink on exit
+        assert unregistered == []
+    finally:
+        writer.close()
+
+def test_closed_block_is_taken_over():
+    old = LiveExporter("whlx_pytest_closed", 4, 28, 18)
+    old.header["closed"] = 1 # As if its env stopped without unlinking it
+    new = LiveExporter("whlx_pytest_closed", 4, 28, 18)
+    assert not LiveReader("whlx_pytest_closed").closed
+    new.close()
+    with pytest.raises(FileNotFoundError):
+        LiveReader("whlx_pytest_closed")
@@ -0,0 +1,23 @@
+# test_spawn.py
+import pytest
+
+from warehouse_env import WarehouseEnv
+
+def test_large_fleet_spawns_on_distinct_tiles():
+    env = WarehouseEnv(num_agents=20, obs_mode="egocentric")
+    for seed in range(3):
+        env.reset(seed=seed)
+        spawns = [agent.pos for agent in env.agents]
+        assert len(set(spawns)) == 20
+        for pos in spawns:
+            assert pos in env.allowed_moves
+            assert pos not in env.shed_tiles and pos not in env.sector_map
+
+def test_default_fleet_keeps_the_classic_spawn_points():
+    env = WarehouseEnv(num_agents=4)
+    env.reset(seed=0)
+    assert [agent.pos for agent in env.agents] == env.spawn_points
+
+def test_fleet_too_big_for_the_map_is_rejected():
+    with pytest.raises(ValueError):
+        WarehouseEnv(num_agents=500, obs_mode="egocentric")
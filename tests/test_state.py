@@ -0,0 +1,22 @@
+# test_state.py
+import pytest
+
+from warehouse_env import WarehouseEnv
+
+TWO_DOCKS = [{"tiles": [[13, 16], [14, 16]], "capacity": 1}, {"tiles": [[4, 16], [5, 16]], "capacity": 1}]
+
+def test_state_restores_into_an_identical_env():
+    env = WarehouseEnv(docks=TWO_DOCKS, carry_capacity=3)
+    env.reset(seed=0)
+    for _ in range(50):
+        env.step(0)
+    twin = WarehouseEnv(**env.sim_config)
+    twin.set_state(env.get_state())
+    assert [a.pos for a in twin.agents] == [a.pos for a in env.agents]
+    assert twin.task_queue == env.task_queue
+
+def test_state_from_another_setup_is_refused():
+    env = WarehouseEnv(docks=TWO_DOCKS, carry_capacity=3)
+    env.reset(seed=0)
+    with pytest.raises(ValueError, match="carry_capacity, docks"):
+        WarehouseEnv().set_state(env.get_state())
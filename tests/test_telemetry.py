@@ -0,0 +1,44 @@
+# test_telemetry.py
+import json
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from telemetry import TelemetryCallback
+from warehouse_env import WarehouseEnv
+
+def read_records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_episode_ticks_and_checkpoint_time(tmp_path):
+    model = PPO("MlpPolicy", DummyVecEnv([WarehouseEnv]), n_steps=64, batch_size=64)
+    checkpoint = SimpleNamespace(save_time=0.0)
+    callback = TelemetryCallback("test", log_dir=str(tmp_path), checkpoint=checkpoint)
+    callback.init_callback(model)
+    callback.on_training_start({}, {})
+
+    env = WarehouseEnv(event_driven=True)
+    env.reset(seed=0)
+    callback.on_rollout_start()
+    ticks = 0
+    for i in range(200):
+        _, reward, _, _, info = env.step(i % 3)
+        ticks += info["ticks"]
+        callback.update_locals({"infos": [info], "rewards": np.array([reward]), "dones": np.array([i == 199])})
+        callback.on_step()
+    callback.on_rollout_end()
+    checkpoint.save_time += 0.05 # A save between the PPO update and the next rollout
+    time.sleep(0.05)
+    callback.on_rollout_start()
+    callback.on_training_end()
+
+    episode, = read_records(tmp_path / "episodes.jsonl")
+    assert ticks > 200 # Event-driven steps skipped some ticks
+    assert episode["ticks"] == ticks
+    rollout, = read_records(tmp_path / "rollouts.jsonl")
+    assert rollout["checkpoint_time_s"] == 0.05
+    assert 0 <= rollout["update_time_s"] < 0.05
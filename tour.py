@@ -0,0 +1,100 @@
+# tour.py
+# Visit order for multi-pick trips: nearest insertion + 2-opt over exact
+# step counts (pathfinder.distance_field). The map has one-way aisles, so
+# d(a, b) != d(b, a) in general and every move is scored on the full tour.
+
+from pathfinder import distance_field
+
+UNREACHABLE = float("inf")
+
+def step_distance(allowed_moves):
+    """d(a, b): exact steps from a to b, read from the cached distance fields."""
+    def d(a, b):
+        return distance_field(b, allowed_moves).get(a, UNREACHABLE)
+    return d
+
+def tour_cost(start, stops, end, d):
+    """Length of start -> stops... -> end (end=None: the trip ends at the last stop)."""
+    cost = 0
+    prev = start
+    for stop in stops:
+        cost += d(prev, stop)
+        prev = stop
+    if end is not None:
+        cost += d(prev, end)
+    return cost
+
+def _cheapest_insertion(start, stops, end, stop, d):
+    """Best (extra cost, index) for inserting 'stop' into the tour."""
+    nodes = [start] + stops
+    best = (UNREACHABLE, len(stops))
+    for i in range(len(nodes)):
+        before = nodes[i]
+        after = nodes[i + 1] if i + 1 < len(nodes) else end
+        if after is None:
+            extra = d(before, stop)
+        else:
+            extra = d(before, stop) + d(stop, after) - d(before, after)
+        if extra < best[0]:
+            best = (extra, i)
+    return best
+
+def nearest_insertion(start, stops, end, d):
+    """
+    Builds the tour one stop at a time: always the stop closest to the tour
+    so far, inserted where it adds the fewest steps.
+    """
+    tour = []
+    remaining = list(stops)
+    while remaining:
+        nodes = [start] + tour
+        closest = min(remaining, key=lambda s: min(d(n, s) for n in nodes))
+        remaining.remove(closest)
+        _, i = _cheapest_insertion(start, tour, end, closest, d)
+        tour.insert(i, closest)
+    return tour
+
+def two_opt(start, stops, end, d):
+    """Reverses segments of the tour while that makes it shorter."""
+    tour = list(stops)
+    best = tour_cost(start, tour, end, d)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(len(tour) - 1):
+            for j in range(i + 1, len(tour)):
+                candidate = tour[:i] + tour[i:j + 1][::-1] + tour[j + 1:]
+                cost = tour_cost(start, candidate, end, d)
+                if cost < best:
+                    tour, best = candidate, cost
+                    improved = True
+    return tour
+
+def plan_tour(start, stops, allowed_moves, end=None):
+    """Visit order for 'stops' on a trip from start (back to end, if given)."""
+    d = step_distance(allowed_moves)
+    return two_opt(start, nearest_insertion(start, stops, end, d), end, d)
+
+def choose_picks(start, first, candidates, capacity, allowed_moves, end=None):
+    """
+    TRIP BATCHING: 'first' is already on the trip; adds up to capacity - 1
+    of the candidates, each time the one that lengthens the trip the least.
+    Returns the chosen candidate indices, in the order they were picked.
+    """
+    d = step_distance(allowed_moves)
+    tour = [first]
+    chosen = []
+    while len(tour) < capacity:
+        best = None
+        for i, candidate in enumerate(candidates):
+            if i in chosen:
+                continue
+            extra, _ = _cheapest_insertion(start, tour, end, candidate, d)
+            if extra < UNREACHABLE and (best is None or extra < best[0]):
+                best = (extra, i)
+        if best is None:
+            break
+        chosen.append(best[1])
+        _, at = _cheapest_insertion(start, tour, end, candidates[best[1]], d)
+        tour.insert(at, candidates[best[1]])
+    return chosen
@@ -0,0 +1,199 @@
+# trace_harness.py
+# Differential testing for faster simulation engines: record seeded reference
+# traces from WarehouseEnv, replay the same shifts on a candidate engine and
+# report the first tick where they disagree, plus the speedup.
+import argparse
+import importlib
+import json
+import os
+import random
+import time
+
+import numpy as np
+
+from warehouse_env import WarehouseEnv
+
+STATE_CODES = {"IDLE": 0, "MOVE": 1, "WAIT": 2, "LOADING": 3, "TERMINATED": 4}
+STATE_NAMES = {code: name for name, code in STATE_CODES.items()}
+
+# Named candidates: env kwargs layered on top of the reference settings
+ENGINES = {
+    "reference": {},
+    "array": {"planner": "array"},
+    "event": {"event_driven": True},
+    "array+event": {"planner": "array", "event_driven": True},
+}
+
+# Rewards are summed per step, so event-driven engines add them up in a
+# different order; anything below this counts as equal
+REWARD_TOLERANCE = 1e-6
+
+# ==========================================
+# RECORDING
+# ==========================================
+def scripted_action(tick, env):
+    """Action for a given tick. Depends only on the tick, so engines that skip
+    ticks still see the same actions on the ticks that matter."""
+    return tick % env.action_space.n
+
+def make_engine(spec, env_kwargs):
+    """
+    'spec' is a name from ENGINES, a JSON dict of env kwargs, or
+    'module:callable' for a different engine (called with the env kwargs).
+    """
+    if spec in ENGINES:
+        return WarehouseEnv(**{**env_kwargs, **ENGINES[spec]})
+    if spec.lstrip().startswith("{"):
+        return WarehouseEnv(**{**env_kwargs, **json.loads(spec)})
+    module_name, _, attr = spec.partition(":")
+    factory = getattr(importlib.import_module(module_name), attr)
+    return factory(**env_kwargs)
+
+def record_trace(env, seed, ticks):
+    """
+    Runs one seeded shift for 'ticks' ticks.
+    Returns per-tick arrays; row i is the state AFTER tick i. Steps that cover
+    several ticks (info["ticks"]) only fill the row of their last tick, and
+    'covered' marks which rows were filled.
+    """
+    # Older engines may still draw from the global RNGs
+    random.seed(seed)
+    np.random.seed(seed)
+    obs, _ = env.reset(seed=seed)
+    n = len(env.agents)
+
+    trace = {
+        "covered": np.zeros(ticks, dtype=bool),
+        "pos": np.zeros((ticks, n, 2), dtype=np.int32),
+        "state": np.zeros((ticks, n), dtype=np.int8),
+        "reward": np.zeros(ticks, dtype=np.float64),   # cumulative
+        "obs": np.zeros((ticks, len(obs)), dtype=np.float32),
+    }
+    tick = 0
+    total = 0.0
+    start = time.perf_counter()
+    while tick < ticks:
+        obs, reward, terminated, truncated, info = env.step(scripted_action(tick, env))
+        tick += info.get("ticks", 1)
+        total += reward
+        if tick > ticks:
+            break # A skip ran past the horizon: nothing left to compare
+        row = tick - 1
+        trace["covered"][row] = True
+        trace["pos"][row] = [a.pos for a in env.agents]
+        trace["state"][row] = [STATE_CODES[a.state] for a in env.agents]
+        trace["reward"][row] = total
+        trace["obs"][row] = obs
+        if terminated:
+            break
+    trace["seconds"] = time.perf_counter() - start
+    trace["ticks"] = min(tick, ticks)
+    return trace
+
+def save_traces(path, traces, meta):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    arrays = {"meta": np.array(json.dumps(meta))}
+    for seed, trace in traces.items():
+        for key, value in trace.items():
+            arrays[f"seed{seed}_{key}"] = np.asarray(value)
+    np.savez_compressed(path, **arrays)
+
+def load_traces(path):
+    data = np.load(path)
+    meta = json.loads(str(data["meta"]))
+    traces = {}
+    for seed in meta["seeds"]:
+        prefix = f"seed{seed}_"
+        traces[seed] = {
+            key[len(prefix):]: data[key] for key in data.files if key.startswith(prefix)
+        }
+        traces[seed]["seconds"] = float(traces[seed]["seconds"])
+        traces[seed]["ticks"] = int(traces[seed]["ticks"])
+    return traces, meta
+
+# ==========================================
+# COMPARISON
+# ==========================================
+def first_divergence(reference, candidate):
+    """
+    Compares two traces on the ticks both of them covered.
+    Returns None if they agree, otherwise a short description of the first
+    mismatch.
+    """
+    rows = np.flatnonzero(reference["covered"] & candidate["covered"])
+    for row in rows:
+        pos_diff = np.flatnonzero((reference["pos"][row] != candidate["pos"][row]).any(axis=1))
+        if len(pos_diff):
+            agent = pos_diff[0]
+            return (f"tick {row}: agent {agent} at {tuple(candidate['pos'][row][agent].tolist())}, "
+                    f"expected {tuple(reference['pos'][row][agent].tolist())}")
+        state_diff = np.flatnonzero(reference["state"][row] != candidate["state"][row])
+        if len(state_diff):
+            agent = state_diff[0]
+            return (f"tick {row}: agent {agent} is {STATE_NAMES[int(candidate['state'][row][agent])]}, "
+                    f"expected {STATE_NAMES[int(reference['state'][row][agent])]}")
+        if abs(reference["reward"][row] - candidate["reward"][row]) > REWARD_TOLERANCE:
+            return (f"tick {row}: cumulative reward {candidate['reward'][row]:.4f}, "
+                    f"expected {reference['reward'][row]:.4f}")
+        obs_diff = np.flatnonzero(reference["obs"][row] != candidate["obs"][row])
+        if len(obs_diff):
+            i = obs_diff[0]
+            return (f"tick {row}: obs[{i}] = {candidate['obs'][row][i]}, "
+                    f"expected {reference['obs'][row][i]}")
+    if candidate["ticks"] != reference["ticks"]:
+        return f"shift lasted {candidate['ticks']} ticks, expected {reference['ticks']}"
+    return None
+
+def compare(traces, meta, engine_spec):
+    """Replays every recorded seed on one engine. Returns (all equal, speedup)."""
+    ref_seconds = 0.0
+    cand_seconds = 0.0
+    all_equal = True
+    print(f"--- {engine_spec} ---")
+    for seed, reference in traces.items():
+        env = make_engine(engine_spec, meta["env_kwargs"])
+        candidate = record_trace(env, seed, meta["ticks"])
+        env.close()
+        ref_seconds += reference["seconds"]
+        cand_seconds += candidate["seconds"]
+        divergence = first_divergence(reference, candidate)
+        if divergence is None:
+            steps = int(candidate["covered"].sum())
+            print(f"seed {seed}: identical over {candidate['ticks']} ticks ({steps} steps)")
+        else:
+            all_equal = False
+            print(f"seed {seed}: DIVERGES at {divergence}")
+    speedup = ref_seconds / cand_seconds if cand_seconds > 0 else float("inf")
+    print(f"reference {ref_seconds:.3f}s, candidate {cand_seconds:.3f}s, speedup x{speedup:.2f}")
+    return all_equal, speedup
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record and compare simulation traces.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="Record reference traces from WarehouseEnv")
+    rec.add_argument("--out", default="traces/reference.npz")
+    rec.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    rec.add_argument("--ticks", type=int, default=3000)
+    rec.add_argument("--env", default="{}", help="Reference env kwargs as JSON")
+
+    cmp = commands.add_parser("compare", help="Check engines against recorded traces")
+    cmp.add_argument("traces", help="File written by 'record'")
+    cmp.add_argument("--engine", action="append", default=None,
+                     help=f"One of {', '.join(ENGINES)}, a JSON dict of env kwargs, "
+                          "or module:callable (repeatable)")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        env_kwargs = {"num_agents": 4, "active_agents": 4, **json.loads(args.env)}
+        traces = {}
+        for seed in args.seeds:
+            traces[seed] = record_trace(WarehouseEnv(**env_kwargs), seed, args.ticks)
+            print(f"seed {seed}: {traces[seed]['ticks']} ticks in {traces[seed]['seconds']:.3f}s")
+        save_traces(args.out, traces, {"seeds": args.seeds, "ticks": args.ticks, "env_kwargs": env_kwargs})
+        print(f"Reference traces written to {args.out}")
+    else:
+        traces, meta = load_traces(args.traces)
+        results = [compare(traces, meta, spec)[0] for spec in (args.engine or list(ENGINES))]
+        raise SystemExit(0 if all(results) else 1)
@@ -1,70 +1,309 @@
 # train.py
-import gymnasium as gym
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import torch
 from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback, CallbackList
+from stable_baselines3.common.env_util import make_vec_env
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecNormalize
+
 from warehouse_env import WarehouseEnv
-import os
+from telemetry import TelemetryCallback
+from dataset_reader import EpisodeDataset
+from policy_loader import normalizer_path
+
+# ==========================================
+# CHECKPOINTS
+# ==========================================
+# One folder holds the latest state of the run:
+#   model.zip          -> policy weights + optimizer state
+#   vecnormalize.pkl   -> observation/reward statistics (if normalize is on)
+#   progress.json      -> which stage we are in and how far we got
+# Every file is written to a temp name first and then swapped in, so a crash
+# in the middle of saving never leaves a half-written checkpoint behind.
+
+def save_checkpoint(checkpoint_dir, model, vec_env, progress):
+    os.makedirs(checkpoint_dir, exist_ok=True)
+
+    model.save(os.path.join(checkpoint_dir, "model.tmp.zip"))
+    os.replace(os.path.join(checkpoint_dir, "model.tmp.zip"), os.path.join(checkpoint_dir, "model.zip"))
+
+    if isinstance(vec_env, VecNormalize):
+        vec_env.save(os.path.join(checkpoint_dir, "vecnormalize.tmp.pkl"))
+        os.replace(os.path.join(checkpoint_dir, "vecnormalize.tmp.pkl"), os.path.join(checkpoint_dir, "vecnormalize.pkl"))
+
+    # progress.json goes last: it is the "commit" of this checkpoint
+    with open(os.path.join(checkpoint_dir, "progress.tmp.json"), "w") as f:
+        json.dump(progress, f, indent=2)
+    os.replace(os.path.join(checkpoint_dir, "progress.tmp.json"), os.path.join(checkpoint_dir, "progress.json"))
+
+def save_normalizer_copy(checkpoint_dir, model_path):
+    """Puts the checkpoint's VecNormalize statistics next to a saved model (see evaluate.py)."""
+    stats_path = os.path.join(checkpoint_dir, "vecnormalize.pkl")
+    if os.path.exists(stats_path):
+        shutil.copyfile(stats_path, normalizer_path(model_path))
+
+def load_progress(checkpoint_dir):
+    path = os.path.join(checkpoint_dir, "progress.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+class CurriculumCheckpoint(BaseCallback):
+    """
+    Saves a checkpoint every 'every' timesteps. Saving happens at the start of
+    a rollout, right after the PPO update, so no collected data is ever lost.
+    """
+
+    def __init__(self, checkpoint_dir, every, stage_index, stage_start, verbose=0):
+        super().__init__(verbose)
+        self.checkpoint_dir = checkpoint_dir
+        self.every = every
+        self.stage_index = stage_index
+        self.stage_start = stage_start # model.num_timesteps when this stage began
+        self.save_time = 0.0 # Seconds spent saving so far (TelemetryCallback reports it)
 
-models_dir = "models/PPO"
-if not os.path.exists(models_dir):
-    os.makedirs(models_dir)
+    def _on_training_start(self):
+        self.last_save = self.num_timesteps
+
+    def _on_rollout_start(self):
+        if self.num_timesteps - self.last_save >= self.every:
+            start = time.perf_counter()
+            save_checkpoint(self.checkpoint_dir, self.model, self.training_env, {
+                "stage": self.stage_index,
+                "stage_start": self.stage_start,
+                "num_timesteps": self.num_timesteps,
+            })
+            self.save_time += time.perf_counter() - start
+            self.last_save = self.num_timesteps
+            if self.verbose:
+                print(f"[CHECKPOINT] Saved at {self.num_timesteps} timesteps")
+
+    def _on_step(self):
+        return True
 
 # ==========================================
-# STAGE 1: THE SOLO CURRICULUM (Easy Mode)
+# BEHAVIOUR-CLONING PRETRAINING
 # ==========================================
-print("---------------------------------------")
-print("STAGE 1: Training Solo Agent (Learning Basics)...")
-print("---------------------------------------")
+def pretrain_policy(model, vec_env, pretrain):
+    """
+    Warm-starts a fresh PPO policy from logged episode data (see
+    generate_dataset.py --format npy) before any RL:
+    - actor: maximise the log-likelihood of the logged dispatch decisions
+    - critic: regress onto the discounted returns of the logged episodes, in
+      the same (normalised) reward units PPO will train it on
+    'pretrain' is the config block: dataset, epochs, batch_size,
+    learning_rate, value_coef.
+    """
+    dataset = EpisodeDataset(pretrain["dataset"])
+    if dataset.obs_size != vec_env.observation_space.shape[0]:
+        raise ValueError(f"Dataset observations have {dataset.obs_size} values, "
+                         f"the env has {vec_env.observation_space.shape[0]}")
+    returns = dataset.returns(model.gamma)
+
+    normalize = isinstance(vec_env, VecNormalize)
+    if normalize:
+        # Prime the observation statistics with the logged data
+        for _, obs, _ in dataset.minibatches(4096, shuffle=False):
+            vec_env.obs_rms.update(obs)
+    if normalize and vec_env.norm_reward:
+        # PPO's critic will see rewards scaled (and clipped) by VecNormalize:
+        # prime its return statistics the way it does, then fit in those units
+        rewards = np.asarray(dataset.rewards, dtype=np.float64)
+        dones = np.asarray(dataset.dones)
+        running = np.zeros(len(rewards))
+        acc = 0.0
+        for i, reward in enumerate(rewards):
+            acc = acc * vec_env.gamma + reward
+            running[i] = acc
+            if dones[i]:
+                acc = 0.0
+        vec_env.ret_rms.update(running)
+        returns = dataset.returns(model.gamma, vec_env.normalize_reward(rewards))
+
+    policy = model.policy
+    policy.set_training_mode(True)
+    optimizer = torch.optim.Adam(policy.parameters(), lr=pretrain.get("learning_rate", 1e-3))
+    value_coef = pretrain.get("value_coef", 0.5)
+    batch_size = pretrain.get("batch_size", 256)
 
-# Initialize environment with 4 slots, but only 1 Active Agent
-env_stage1 = WarehouseEnv(render_mode=None, num_agents=4, active_agents=1)
+    print(f"Pretraining on {len(dataset)} logged decisions from {pretrain['dataset']}")
+    for epoch in range(pretrain.get("epochs", 5)):
+        bc_loss = 0.0
+        value_loss = 0.0
+        correct = 0
+        for idx, obs, actions in dataset.minibatches(batch_size, seed=epoch):
+            if normalize:
+                obs = vec_env.normalize_obs(obs)
+            obs_t = torch.as_tensor(obs, dtype=torch.float32, device=policy.device)
+            actions_t = torch.as_tensor(actions, device=policy.device)
+            returns_t = torch.as_tensor(returns[idx], device=policy.device)
 
-# Train a new model from scratch
-model = PPO("MlpPolicy", env_stage1, verbose=1, learning_rate=0.0003, n_steps=2048)
-model.learn(total_timesteps=50000) # Short run to learn basic fetching
+            values, log_prob, _ = policy.evaluate_actions(obs_t, actions_t)
+            actor_loss = -log_prob.mean()
+            critic_loss = torch.nn.functional.mse_loss(values.flatten(), returns_t)
+            loss = actor_loss + value_coef * critic_loss
 
-# Save the "Pre-trained" brain
-stage1_path = f"{models_dir}/warehouse_stage1_solo"
-model.save(stage1_path)
-print(f"Stage 1 Complete. Saved to {stage1_path}")
+            optimizer.zero_grad()
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(policy.parameters(), model.max_grad_norm)
+            optimizer.step()
 
-env_stage1.close() # Close to free up memory
+            bc_loss += actor_loss.item() * len(idx)
+            value_loss += critic_loss.item() * len(idx)
+            with torch.no_grad():
+                correct += (policy.get_distribution(obs_t).mode() == actions_t).sum().item()
+        print(f"[PRETRAIN] Epoch {epoch + 1}: BC loss {bc_loss / len(dataset):.4f}, "
+              f"value loss {value_loss / len(dataset):.3f}, action match {correct / len(dataset):.1%}")
+    policy.set_training_mode(False)
 
 # ==========================================
-# STAGE 2: THE TEAM CURRICULUM (Hard Mode)
+# CURRICULUM RUNNER
 # ==========================================
-print("---------------------------------------")
-print("STAGE 2: Training Full Team (Learning Coordination)...")
-print("---------------------------------------")
+def make_stage_env(config, stage, checkpoint_dir=None, stats_path=None):
+    n_envs = stage.get("n_envs", 1)
+    vec_env = make_vec_env(
+        WarehouseEnv,
+        n_envs=n_envs,
+        env_kwargs={
+            "render_mode": None,
+            "num_agents": config["num_agents"],
+            "active_agents": stage["active_agents"],
+            **stage.get("env_kwargs", {}),
+        },
+        vec_env_cls=SubprocVecEnv if n_envs > 1 else DummyVecEnv,
+    )
+    if config.get("normalize", False):
+        if stats_path and os.path.exists(stats_path):
+            # Keep the statistics learned so far (previous stage or checkpoint)
+            vec_env = VecNormalize.load(stats_path, vec_env)
+            vec_env.training = True
+        else:
+            vec_env = VecNormalize(vec_env)
+    return vec_env
+
+def run_curriculum(config, fresh=False):
+    models_dir = config["models_dir"]
+    checkpoint_dir = config["checkpoint_dir"]
+    stats_path = os.path.join(checkpoint_dir, "vecnormalize.pkl")
+    os.makedirs(models_dir, exist_ok=True)
+
+    progress = None if fresh else load_progress(checkpoint_dir)
+    if progress is None:
+        progress = {"stage": 0, "stage_start": 0, "num_timesteps": 0}
+        has_checkpoint = False
+    else:
+        has_checkpoint = True
+        print(f"Resuming from checkpoint: stage {progress['stage'] + 1}, {progress['num_timesteps']} timesteps")
+
+    model = None
+    vec_env = None
+    stages = config["stages"]
+
+    for stage_index in range(progress["stage"], len(stages)):
+        stage = stages[stage_index]
+        print("---------------------------------------")
+        print(f"STAGE {stage_index + 1}/{len(stages)}: {stage['name']} "
+              f"({stage['active_agents']} active agents, {stage['timesteps']} timesteps)")
+        print("---------------------------------------")
 
-# Initialize environment with ALL 4 Agents active
-env_stage2 = WarehouseEnv(render_mode=None, num_agents=4, active_agents=4)
+        vec_env = make_stage_env(config, stage, stats_path=stats_path if has_checkpoint else None)
 
-# Load the brain from Stage 1
-# This works because obs_size is identical (thanks to Phantom Agents)
-model = PPO.load(stage1_path, env=env_stage2)
+        if has_checkpoint:
+            # Works across stages too: obs_size is identical thanks to Phantom Agents
+            model = PPO.load(os.path.join(checkpoint_dir, "model.zip"), env=vec_env)
+        else:
+            model = PPO("MlpPolicy", vec_env, verbose=1, **config["ppo"])
+            if config.get("pretrain"):
+                pretrain_policy(model, vec_env, config["pretrain"])
+                # Checkpoint right away, so a crash in stage 1 does not redo it
+                save_checkpoint(checkpoint_dir, model, vec_env, {
+                    "stage": stage_index, "stage_start": 0, "num_timesteps": 0,
+                })
+                has_checkpoint = True
 
-# Train for longer to adapt to traffic
-model.learn(total_timesteps=150000) 
+        if stage_index == progress["stage"]:
+            stage_start = progress["stage_start"]
+        else:
+            stage_start = model.num_timesteps
+        remaining = stage["timesteps"] - (model.num_timesteps - stage_start)
 
-# Save the Final Model
-final_path = f"{models_dir}/warehouse_final_mas"
-model.save(final_path)
-print(f"Stage 2 Complete. Final model saved to {final_path}")
+        if remaining > 0:
+            checkpoint = CurriculumCheckpoint(checkpoint_dir, config["checkpoint_every"], stage_index, stage_start)
+            callback = CallbackList([
+                checkpoint, # Saves before TelemetryCallback's rollout_start, see there
+                TelemetryCallback(stage=stage["name"], log_dir=config["telemetry_dir"], checkpoint=checkpoint),
+            ])
+            model.learn(total_timesteps=remaining, callback=callback, reset_num_timesteps=False)
+
+        # Stage finished: keep a named copy and move the checkpoint on to the next stage
+        stage_path = f"{models_dir}/warehouse_{stage['name']}"
+        model.save(stage_path)
+        save_checkpoint(checkpoint_dir, model, vec_env, {
+            "stage": stage_index + 1,
+            "stage_start": model.num_timesteps,
+            "num_timesteps": model.num_timesteps,
+        })
+        has_checkpoint = True
+        if config.get("normalize", False):
+            save_normalizer_copy(checkpoint_dir, stage_path)
+        print(f"Stage {stage_index + 1} Complete. Saved to {stage_path}")
+        vec_env.close() # Close to free up memory
+
+    if model is None:
+        # Everything was already done in a previous run
+        model = PPO.load(os.path.join(checkpoint_dir, "model.zip"))
+
+    final_path = f"{models_dir}/{config['final_model']}"
+    model.save(final_path)
+    if config.get("normalize", False):
+        save_normalizer_copy(checkpoint_dir, final_path)
+    print(f"Curriculum Complete. Final model saved to {final_path}")
+    return model
 
 # ==========================================
 # VISUALIZATION
 # ==========================================
-print("Switching to Visual Mode...")
-env_stage2.close()
-
-env_test = WarehouseEnv(render_mode="human", num_agents=4, active_agents=4)
-obs, _ = env_test.reset()
-
-running = True
-while running:
-    action, _ = model.predict(obs)
-    obs, reward, terminated, truncated, info = env_test.step(action)
-    env_test.render()
-    
-    if terminated:
-        obs, _ = env_test.reset()
\ No newline at end of file
+def watch(model, config):
+    print("Switching to Visual Mode...")
+    # Same env settings as the last stage (e.g. obs_mode), or the obs won't fit the model
+    env_kwargs = config["stages"][-1].get("env_kwargs", {})
+    normalizer = None
+    stats_path = os.path.join(config["checkpoint_dir"], "vecnormalize.pkl")
+    if config.get("normalize", False) and os.path.exists(stats_path):
+        normalizer = VecNormalize.load(stats_path, DummyVecEnv([lambda: WarehouseEnv(num_agents=config["num_agents"], **env_kwargs)]))
+        normalizer.training = False
+
+    env_test = WarehouseEnv(render_mode="human", num_agents=config["num_agents"], active_agents=config["num_agents"], **env_kwargs)
+    obs, _ = env_test.reset()
+
+    running = True
+    while running:
+        policy_obs = normalizer.normalize_obs(obs) if normalizer else obs
+        action, _ = model.predict(policy_obs)
+        obs, reward, terminated, truncated, info = env_test.step(action)
+        env_test.render()
+        
+        if terminated:
+            obs, _ = env_test.reset()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Curriculum training for the warehouse dispatcher.")
+    parser.add_argument("--config", default="curriculum.json", help="Curriculum config (JSON)")
+    parser.add_argument("--fresh", action="store_true", help="Ignore existing checkpoints and start over")
+    parser.add_argument("--no-watch", action="store_true", help="Skip the visual demo after training")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+
+    model = run_curriculum(config, fresh=args.fresh)
+    if not args.no_watch:
+        watch(model, config)
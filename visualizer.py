@@ -66,4 +66,111 @@ def draw_path(screen, path, color):
     
     # Optional: Draw tiny dots at each step to see discrete tiles
     for (cx, cy) in pixel_points:
-        pygame.draw.circle(screen, color, (cx, cy), 3)
\ No newline at end of file
+        pygame.draw.circle(screen, color, (cx, cy), 3)
+# ==========================================
+# SCENE PRIMITIVES (shared by full and incremental rendering)
+# ==========================================
+# A frame is a list of plain tuples, drawn in order:
+#   ("rect",   color, (x, y, w, h), width)
+#   ("circle", color, (cx, cy), radius, width)
+#   ("lines",  color, (p1, p2, ...), width)
+#   ("line",   color, start, end, width)
+#   ("text",   char, color, (x, y))
+# Because they are hashable, two frames can be diffed with set operations.
+
+_glyphs = {}
+
+def _glyph(font, char, color):
+    key = (id(font), char, color)
+    if key not in _glyphs:
+        _glyphs[key] = font.render(char, True, color)
+    return _glyphs[key]
+
+def draw_primitive(screen, font, item):
+    kind = item[0]
+    if kind == "rect":
+        _, color, rect, width = item
+        pygame.draw.rect(screen, color, rect, width)
+    elif kind == "circle":
+        _, color, center, radius, width = item
+        pygame.draw.circle(screen, color, center, radius, width=width)
+    elif kind == "lines":
+        _, color, points, width = item
+        pygame.draw.lines(screen, color, False, points, width)
+    elif kind == "line":
+        _, color, start, end, width = item
+        pygame.draw.line(screen, color, start, end, width)
+    elif kind == "text":
+        _, char, color, pos = item
+        screen.blit(_glyph(font, char, color), pos)
+
+def primitive_bounds(font, item):
+    """Screen area a primitive can touch (with a 1px margin for anti-aliasing)."""
+    kind = item[0]
+    if kind == "rect":
+        return pygame.Rect(item[2]).inflate(2, 2)
+    if kind == "circle":
+        (cx, cy), radius = item[2], item[3]
+        return pygame.Rect(cx - radius - 1, cy - radius - 1, 2 * radius + 3, 2 * radius + 3)
+    if kind in ("lines", "line"):
+        points = item[2] if kind == "lines" else (item[2], item[3])
+        width = item[-1]
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        pad = width + 1
+        return pygame.Rect(min(xs) - pad, min(ys) - pad, max(xs) - min(xs) + 2 * pad + 1, max(ys) - min(ys) + 2 * pad + 1)
+    if kind == "text":
+        w, h = font.size(item[1])
+        return pygame.Rect(item[3][0], item[3][1], w, h)
+    raise ValueError(f"Unknown primitive {kind}")
+
+class IncrementalRenderer:
+    """
+    DIRTY-RECTANGLE RENDERING: The grid is drawn once into a background
+    surface. Each frame, only primitives that appeared or disappeared since the
+    last frame mark their area as dirty; those areas are restored from the
+    background, everything overlapping them is redrawn (clipped, in order), and
+    only they are pushed to the screen with pygame.display.update(rects).
+    (Clipped diagonal lines can land one pixel off where they cross a dirty
+    rectangle's edge; everything else matches a full redraw exactly.)
+    """
+
+    def __init__(self, screen, grid, allowed_moves, font):
+        self.font = font
+        self.background = pygame.Surface(screen.get_size())
+        self.background.fill((30, 30, 30)) # Dark background
+        draw_grid(self.background, grid, allowed_moves)
+        self.previous = None
+        self.dirty_area = 0 # Pixels pushed last frame (for benchmarking)
+
+    def draw(self, screen, scene):
+        if self.previous is None:
+            # First frame: everything is new
+            screen.blit(self.background, (0, 0))
+            for item in scene:
+                draw_primitive(screen, self.font, item)
+            pygame.display.flip()
+            self.previous = scene
+            self.dirty_area = screen.get_width() * screen.get_height()
+            return
+
+        changed = set(self.previous).symmetric_difference(scene)
+        self.previous = scene
+        if not changed:
+            self.dirty_area = 0
+            return
+
+        dirty = [primitive_bounds(self.font, item).clip(screen.get_rect()) for item in changed]
+        dirty = [rect for rect in dirty if rect.width and rect.height]
+        placed = [(item, primitive_bounds(self.font, item)) for item in scene]
+
+        for rect in dirty:
+            screen.set_clip(rect)
+            screen.blit(self.background, rect, rect)
+            for item, bounds in placed:
+                if bounds.colliderect(rect):
+                    draw_primitive(screen, self.font, item)
+        screen.set_clip(None)
+
+        pygame.display.update(dirty)
+        self.dirty_area = sum(rect.width * rect.height for rect in dirty)
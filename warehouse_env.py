@@ -1,13 +1,21 @@
 # warehouse_env.py
+import copy
+import pickle
 import pygame
 import random
 import numpy as np
 import gymnasium as gym
 from gymnasium import spaces
 
-from warehouse_map import build_map, build_sectors, WIDTH, HEIGHT, CELL_SIZE
-from visualizer import draw_grid, draw_agent, draw_path
+from warehouse_map import build_map, build_sectors, WIDTH, HEIGHT, CELL_SIZE, SHED, JUNCTION
+from visualizer import draw_grid, draw_agent, draw_path, draw_primitive, IncrementalRenderer
 from agent import Agent
+from pathfinder import PLANNERS, a_star_batch, distance_field
+from hierarchical_planner import HierarchicalPlanner
+from docks import Dock, default_docks
+from layout import load_layout
+from tour import choose_picks, plan_tour
+from live_export import LiveExporter
 
 # AGENT COLORS:
 AGENT_COLORS = [
@@ -17,28 +25,121 @@ AGENT_COLORS = [
     (255, 0, 255)    # Magenta
 ]
 
+# Bump this whenever the layout of get_state() changes
+STATE_VERSION = 6
+
+TASKS_PER_SHIFT = 100 # reset() queues this many
+
+# Event-driven mode: most ticks one step may jump over. A stretch where
+# agents only queue behind each other has no next event at all.
+EVENT_SKIP_LIMIT = 100
+
+# Egocentric observation (obs_mode="egocentric"):
+EGO_TOP_TASKS = 3      # Tasks described (the ones the action can pick)
+EGO_TASK_FEATURES = 4  # [steps there, steps back to a dock, sector busy, exists]
+EGO_STATES = ("IDLE", "MOVE", "WAIT", "LOADING", "TERMINATED")
+
 class WarehouseEnv(gym.Env):
     metadata = {"render_modes": ["human", "rgb_array"], "render_fps": 10}
 
-    def __init__(self, render_mode=None, num_agents=4, active_agents=None):
+    def __init__(self, render_mode=None, num_agents=4, active_agents=None, planner="astar",
+                 batch_planning=False, incremental_render=False, congestion_routing=False,
+                 congestion_decay=0.9, congestion_weight=1.0, docks=None, event_driven=False,
+                 layout=None, carry_capacity=1, pick_window=10, obs_mode="absolute",
+                 export_shm=None):
         super().__init__()
         
         # --- Map Setup ---
-        self.grid, self.allowed_moves = build_map()
-        self.sector_map = build_sectors(self.grid)
-        self.shed_pos = (WIDTH // 2, HEIGHT - 2)
-        self.shed_tiles = [
-            (WIDTH // 2 - 1, HEIGHT - 2), 
-            (WIDTH // 2, HEIGHT - 2)
-        ]
+        # Built-in map, or a .layout file (compiled once and cached on disk, see layout.py)
+        layout_docks = None
+        if layout is not None:
+            compiled = load_layout(layout)
+            self.grid = [list(row) for row in compiled.grid] # Own copy: docks repaint it
+            self.allowed_moves = compiled.allowed_moves
+            self.sector_map = compiled.sector_map
+            width, height = compiled.width, compiled.height
+            layout_docks = compiled.docks or None
+        else:
+            self.grid, self.allowed_moves = build_map()
+            self.sector_map = build_sectors(self.grid)
+            width, height = WIDTH, HEIGHT
+
+        # --- Docks (Sheds) ---
+        # 'docks' is a list of Dock objects or dicts ({"tiles": [...], "capacity": n}).
+        # Default: the layout's docks, else the single bottom-centre Shed,
+        # roomy enough for the whole fleet.
+        if docks is None:
+            docks = layout_docks or default_docks(width, height, capacity=num_agents)
+        self.docks = [Dock.from_spec(d) for d in docks]
+        for dock in self.docks:
+            dock.build_fields(self.allowed_moves)
+        self.dock_index = {tile: i for i, dock in enumerate(self.docks) for tile in dock.tiles}
+        for y, row in enumerate(self.grid):
+            for x, cell in enumerate(row):
+                if cell == SHED and (x, y) not in self.dock_index:
+                    row[x] = JUNCTION # The built-in Shed is not a dock in this layout
+        for (x, y) in self.dock_index:
+            self.grid[y][x] = SHED
+        # Every dock tile is exempt from collisions, like the original Shed
+        self.shed_tiles = list(self.dock_index)
+        self.shed_pos = self.docks[0].pos
         
         # --- Dimensions ---
-        self.width = WIDTH
-        self.height = HEIGHT
+        self.width = width
+        self.height = height
         self.cell_size = CELL_SIZE
         self.num_agents = num_agents
 
         self.active_agents = active_agents if active_agents is not None else num_agents
+
+        # --- Spawn Tiles ---
+        # The classic four spawn points first (where walkable); bigger fleets
+        # get the rest from the free aisle tiles closest to a dock, one agent per tile.
+        classic = [(2, height - 2), (width - 3, height - 2), (8, height - 2), (19, height - 2)]
+        self.spawn_points = [p for p in classic if p in self.allowed_moves]
+        extra = [
+            tile for tile in self.allowed_moves
+            if tile not in self.dock_index and tile not in self.sector_map and tile not in self.spawn_points
+            and any(dock.distance(tile) is not None for dock in self.docks)
+        ]
+        self.spawn_pool = sorted(extra, key=lambda t: (min(d.distance(t) for d in self.docks if d.distance(t) is not None), t))
+        if min(self.active_agents, num_agents) > len(self.spawn_points) + len(self.spawn_pool):
+            raise ValueError(
+                f"{self.active_agents} agents do not fit on this map "
+                f"({len(self.spawn_points) + len(self.spawn_pool)} spawn tiles)"
+            )
+
+        # --- Pathfinding Backend ---
+        # "astar" = dict version, "array" = GridGraph, "hpa" = sector-level hierarchical routing
+        # (two legs per query; agents ask again when they run out)
+        if planner == "hpa":
+            self.planner = HierarchicalPlanner(self.allowed_moves, self.sector_map, refine_segments=2)
+        else:
+            self.planner = PLANNERS[planner]
+        # Batch Planning: agents queue their searches, the env solves them together
+        self.plan_queue = [] if batch_planning else None
+
+        # --- Congestion Routing ---
+        # 'traffic' is a decayed count of agents per tile (indexed [x, y]);
+        # planners pay congestion_weight * traffic extra for stepping onto a tile,
+        # which spreads routes over the outer aisles instead of the middle one.
+        self.congestion_routing = congestion_routing
+        self.congestion_decay = congestion_decay
+        self.congestion_weight = congestion_weight
+        if congestion_routing and planner == "hpa":
+            raise ValueError("congestion_routing needs a flat planner ('astar' or 'array')")
+        self.traffic = np.zeros((width, height), dtype=np.float64)
+        self.route_costs = np.zeros((width, height), dtype=np.float64)
+        
+        # Multi-Pick Trips: up to carry_capacity pallets per trip from the dock.
+        # The action picks the first one; the rest come from the next
+        # pick_window tasks, whichever lengthen the trip least (see tour.py).
+        self.carry_capacity = carry_capacity
+        self.pick_window = pick_window
+
+        # Event-Driven Mode: step() also fast-forwards through the following
+        # ticks in which only countdowns run: LOADING timers and patience (see info["ticks"])
+        self.event_driven = event_driven
         
         # --- IMPROVEMENT 2: SMARTER EYES (Relative Coordinates) ---
         # 1. Agent Positions: [x, y] * num_agents
@@ -49,22 +150,62 @@ class WarehouseEnv(gym.Env):
         
         # We allow negative values now (relative vectors can be negative)
         self.observation_space = spaces.Box(
-            low=-max(WIDTH, HEIGHT), high=max(WIDTH, HEIGHT), shape=(obs_size,), dtype=np.float32
+            low=-max(width, height), high=max(width, height), shape=(obs_size,), dtype=np.float32
         )
         
+
+        # --- Observation Mode ---
+        # "absolute"   = the agent coordinates + task vectors above (grows with num_agents)
+        # "egocentric" = fixed-size summary seen from the dispatch point (sector
+        #                occupancy/congestion + top-3 task features), so the same
+        #                model runs any fleet size (see _get_egocentric_obs)
+        if obs_mode not in ("absolute", "egocentric"):
+            raise ValueError(f"Unknown obs_mode {obs_mode!r} (use 'absolute' or 'egocentric')")
+        self.obs_mode = obs_mode
+        # The egocentric obs reads the traffic heatmap, so keep it up to date then too
+        self.track_traffic = congestion_routing or obs_mode == "egocentric"
+        if obs_mode == "egocentric":
+            self._build_obs_tables()
+            obs_size = 2 * self.obs_buckets + EGO_TOP_TASKS * EGO_TASK_FEATURES + len(EGO_STATES) + 1
+            self.observation_space = spaces.Box(low=-1.0, high=np.inf, shape=(obs_size,), dtype=np.float32)
+        
+        # --- Live Export ---
+        # Publishes every step into the shared-memory block 'export_shm' for
+        # external monitors (python live_export.py NAME); one name per env.
+        self.exporter = LiveExporter(export_shm, num_agents, width, height) if export_shm else None
+
         # Action Space stays the same (Pick Index 0, 1, or 2)
         self.action_space = spaces.Discrete(3)
 
+        # --- Simulation Config ---
+        # The arguments that decide how a state plays out. WarehouseEnv(**sim_config)
+        # builds an env that can run this one's states (rollout workers do), and
+        # every snapshot carries it so set_state() refuses states from another setup.
+        self.sim_config = {
+            "num_agents": num_agents, "planner": planner, "batch_planning": batch_planning,
+            "congestion_routing": congestion_routing, "congestion_decay": congestion_decay,
+            "congestion_weight": congestion_weight, "event_driven": event_driven, "layout": layout,
+            "docks": [{"tiles": d.tiles, "capacity": d.capacity, "name": d.name, "pos": d.pos} for d in self.docks],
+            "carry_capacity": carry_capacity, "pick_window": pick_window, "obs_mode": obs_mode,
+        }
+
         # --- Simulation State ---
+        # Own RNG (instead of the global 'random' module) so states can be forked
+        self.rng = random.Random()
         self.agents = []
         self.task_queue = []
         self.sector_occupancy = {}
         self.window = None
         self.clock = None
         self.render_mode = render_mode
+        # Dirty-rectangle rendering: only redraw what changed since the last frame
+        self.incremental_render = incremental_render
+        self.renderer = None
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
+        if seed is not None:
+            self.rng.seed(seed)
         
         # 1. Regenerate Tasks
         all_sector_locs = list(self.sector_map.keys())
@@ -72,33 +213,43 @@ class WarehouseEnv(gym.Env):
             (x, y) for (x, y) in all_sector_locs 
             if self.grid[y][x] == "P" and (x, y) not in self.shed_tiles
         ]
-        self.task_queue = [random.choice(all_pallet_locs) for _ in range(100)]
+        self.task_queue = [self.rng.choice(all_pallet_locs) for _ in range(TASKS_PER_SHIFT)]
         
         # 2. Reset Agents
         self.agents = []
-        spawn_points = [
-            (2, self.height - 2), (self.width - 3, self.height - 2),
-            (8, self.height - 2), (19, self.height - 2)
-        ]
-        
+        spawn_points = self._spawn_tiles(min(self.active_agents, self.num_agents))
+
         for i in range(self.num_agents):
             # LOGIC: If agent index is >= active_agents, hide them!
             if i < self.active_agents:
-                pos = spawn_points[i % len(spawn_points)]
-                self.agents.append(Agent(i, pos))
+                pos = spawn_points[i]
+                self.agents.append(Agent(i, pos, self.rng, self.planner))
             else:
                 # Phantom Agents: Place them far off-screen so they don't block anyone
                 # They exist for the 'Brain Shape' but do nothing.
-                self.agents.append(Agent(i, (-100, -100))) 
+                self.agents.append(Agent(i, (-100, -100), self.rng, self.planner))
             
+        self.traffic.fill(0.0)
+        self.route_costs.fill(0.0)
+        for dock in self.docks:
+            dock.set_state(([], 0, 0, 0, 0, 0))
+        for agent in self.agents:
+            agent.plan_queue = self.plan_queue
+            agent.cell_costs = self.route_costs if self.congestion_routing else None
+
         # 3. Initial Dispatch (Only for active agents)
         for agent in self.agents:
             if agent.pos[0] > -50: # Check if agent is on screen
                 if self.task_queue:
                     target = self.task_queue.pop(0)
                     agent.set_target(target, self.allowed_moves)
+        self._flush_plans()
                 
         self.sector_occupancy = {}
+
+        if self.exporter is not None:
+            self.exporter.reset()
+            self.exporter.publish(self)
         
         return self._get_obs(), {}
 
@@ -109,6 +260,10 @@ class WarehouseEnv(gym.Env):
         total_reward = 0
         total_reward -= 0.01 * self.num_agents
 
+        # Telemetry counters for this tick (returned in 'info')
+        tasks_completed = 0
+        replans_before = sum(a.replan_count for a in self.agents)
+
         # --- 0. WAKE UP LOGIC (For Interactive Mode) ---
         for agent in self.agents:
             if agent.state == "TERMINATED" and self.task_queue:
@@ -126,17 +281,26 @@ class WarehouseEnv(gym.Env):
             
             if agent.task_complete or is_unemployed:
                 total_reward += 10.0 if agent.task_complete else 0 # Only reward finishing work
+                if agent.task_complete and agent.pos not in self.dock_index:
+                    tasks_completed += 1 # A pallet; loading at a dock finishes a trip, not a task
                 
-                # If agent finished a task (or is unemployed), go to Shed
-                if agent.pos not in self.shed_tiles:
-                    closest_shed = min(self.shed_tiles, key=lambda p: abs(p[0]-agent.pos[0]) + abs(p[1]-agent.pos[1]))
-                    agent.set_target(closest_shed, self.allowed_moves)
+                # Still carrying picks for this trip? Go to the next pallet on the tour
+                if agent.pick_list:
+                    agent.set_target(agent.pick_list.pop(0), self.allowed_moves)
+                # If agent finished a task (or is unemployed), go to the nearest Dock with room
+                elif agent.pos not in self.shed_tiles:
+                    dock = self._choose_dock(agent.pos)
+                    dock.queue.append(agent.id)
+                    agent.set_target(dock.nearest_tile(agent.pos), self.allowed_moves)
                 else:
                     # If at shed, get new task
                     if self.task_queue:
                         idx = action
                         if idx >= len(self.task_queue): idx = 0
                         next_task = self.task_queue.pop(idx)
+                        self.docks[self.dock_index[agent.pos]].dispatches += 1
+                        if self.carry_capacity > 1:
+                            next_task = self._plan_trip(agent, next_task)
                         agent.set_target(next_task, self.allowed_moves)
                     else:
                         agent.state = "TERMINATED"
@@ -144,7 +308,21 @@ class WarehouseEnv(gym.Env):
                 
                 agent.task_complete = False
 
+        # Batch Planning: new routes for this tick's hires, plus agents that lost their path
+        if self.plan_queue is not None:
+            queued = {agent.id for agent, _, _ in self.plan_queue}
+            for agent in self.agents:
+                if agent.pos[0] < -50: continue # Skip Phantoms
+                if agent.state in ("TERMINATED", "LOADING") or agent.id in queued: continue
+                if agent.is_lost():
+                    self.plan_queue.append((agent, "resume", None))
+            self._flush_plans()
+
         # --- 2. MOVEMENT LOOP (With Reward Shaping) ---
+        # PHASE A: Every agent declares where it wants to go, judged against the
+        # positions at the START of the tick (so agent order no longer matters).
+        intents = {}     # agent.id -> next_pos
+        prev_dists = {}  # agent.id -> distance to target before moving
         for agent in self.agents:
             if agent.pos[0] < -50: continue # Skip Phantoms
 
@@ -160,50 +338,52 @@ class WarehouseEnv(gym.Env):
             prev_dist = 0
             if agent.target:
                 prev_dist = abs(agent.pos[0] - agent.target[0]) + abs(agent.pos[1] - agent.target[1])
+            prev_dists[agent.id] = prev_dist
             # ---------------------------------------
 
             # ASK THE AGENT: "Where do you want to go?"
             next_pos = agent.negotiate_move(self.allowed_moves, self.agents, self.shed_tiles)
             
             if next_pos:
-                can_move = True
-                
-                # A. SAFETY NET: Physical Collision
-                if next_pos not in self.shed_tiles:
-                    for other in self.agents:
-                        if other.id != agent.id and other.pos == next_pos:
-                            can_move = False
-                            break
-                
-                # B. SECTOR MANAGER
+                intents[agent.id] = next_pos
+
+        # PHASE B: Resolve all vertex and edge (swap) conflicts in one pass
+        movers, held, vertex_conflicts, edge_conflicts = self._resolve_moves(intents)
+
+        # PHASE C: Commit the surviving moves
+        for agent in self.agents:
+            if agent.id not in intents:
+                continue
+
+            next_pos = intents[agent.id]
+            if agent.id in movers:
+                # Update Sector Manager
                 curr_sec = self.sector_map.get(agent.pos)
                 next_sec = self.sector_map.get(next_pos)
+
+                if curr_sec is not None and curr_sec != next_sec:
+                    if self.sector_occupancy.get(curr_sec) == agent.id:
+                        del self.sector_occupancy[curr_sec]
                 
-                if next_sec is not None and next_sec != curr_sec:
-                    if next_pos not in self.shed_tiles: 
-                        owner = self.sector_occupancy.get(next_sec)
-                        if owner is not None and owner != agent.id:
-                            can_move = False
-                
-                if can_move:
-                    # Update Sector Manager
-                    if curr_sec is not None and curr_sec != next_sec:
-                        if self.sector_occupancy.get(curr_sec) == agent.id:
-                            del self.sector_occupancy[curr_sec]
-                    
-                    if next_sec is not None:
-                        if next_pos not in self.shed_tiles:
-                            self.sector_occupancy[next_sec] = agent.id
-                    
-                    # Commit the move
-                    agent.pos = next_pos
+                if next_sec is not None:
+                    if next_pos not in self.shed_tiles:
+                        self.sector_occupancy[next_sec] = agent.id
                 
-                agent.update()
+                # Commit the move
+                agent.move_to(next_pos)
+            elif agent.id in held:
+                agent.state = "WAIT" # Queueing for a dock slot, like queueing behind a blocker
+            elif next_pos != agent.pos:
+                # Lost the tile, its sector or the way ahead: same reasoning as a blocker
+                agent.reject_move(next_pos, self.allowed_moves, self.agents, self.shed_tiles)
+            
+            agent.update()
 
             # --- REWARD SHAPING ADDITION (END) ---
 
             # C. Calculate Distance AFTER Moving & Apply Reward
             if agent.target:
+                prev_dist = prev_dists[agent.id]
                 curr_dist = abs(agent.pos[0] - agent.target[0]) + abs(agent.pos[1] - agent.target[1])
                 
                 if curr_dist < prev_dist:
@@ -213,13 +393,453 @@ class WarehouseEnv(gym.Env):
                 
                 # Note: If dist is same (waiting), the standard time penalty (-0.01) applies
 
+        if self.track_traffic:
+            self._update_traffic()
+        self._update_docks()
+
+        # Detours requested while negotiating are solved together, ready for next tick
+        self._flush_plans()
+
         active_list = [a for a in self.agents if a.pos[0] > -50]
         if all(a.state == "TERMINATED" for a in active_list):
             terminated = True
+
+        # --- 3. EVENT-DRIVEN SKIP ---
+        # Quiet ticks only cost the time penalty, so they are paid in one go
+        waiting = sum(1 for a in active_list if a.state == "WAIT")
+        skipped = 0
+        if self.event_driven:
+            skipped, skipped_vertex, skipped_edge = self._skip_quiet_ticks()
+            vertex_conflicts += skipped_vertex
+            edge_conflicts += skipped_edge
+            waiting += skipped * sum(1 for a in active_list if a.state == "WAIT")
+        total_reward -= 0.01 * self.num_agents * skipped
             
-        return self._get_obs(), total_reward, terminated, truncated, {}
+        info = {
+            "vertex_conflicts": vertex_conflicts,
+            "edge_conflicts": edge_conflicts,
+            "tasks_completed": tasks_completed,
+            "wait_ticks": waiting,
+            "agent_ticks": (1 + skipped) * sum(1 for a in active_list if a.state != "TERMINATED"),
+            "replans": sum(a.replan_count for a in self.agents) - replans_before,
+            "ticks": 1 + skipped,
+        }
+        if self.exporter is not None:
+            self.exporter.publish(self, info, total_reward)
+        return self._get_obs(), total_reward, terminated, truncated, info
+
+    def _flush_plans(self):
+        """
+        BATCHED PLANNING: Solve every search queued by the agents in one call.
+        """
+        if not self.plan_queue:
+            return
+        requests = list(self.plan_queue)
+        self.plan_queue.clear()
+
+        queries = [
+            (agent.pos, agent.target, {obstacle} if obstacle is not None else None)
+            for agent, _, obstacle in requests
+        ]
+        cell_costs = self.route_costs if self.congestion_routing else None
+        paths = a_star_batch(queries, self.allowed_moves, self.planner, cell_costs)
+        for (agent, kind, _), path in zip(requests, paths):
+            agent.apply_plan(kind, path, self.allowed_moves, self.agents, self.shed_tiles)
+
+    def _plan_trip(self, agent, first):
+        """
+        MULTI-PICK TRIP: Adds more pallets from the head of the task queue to
+        'first', orders them as a tour from the dock and back, and stores all
+        but the first stop in agent.pick_list. Returns the first stop.
+        """
+        window = self.task_queue[:self.pick_window]
+        chosen = choose_picks(agent.pos, first, window, self.carry_capacity,
+                              self.allowed_moves, end=agent.pos)
+        stops = [first] + [window[i] for i in chosen]
+        for i in sorted(chosen, reverse=True):
+            self.task_queue.pop(i)
+        tour = plan_tour(agent.pos, stops, self.allowed_moves, end=agent.pos)
+        agent.pick_list = tour[1:]
+        return tour[0]
+
+    def _spawn_tiles(self, count):
+        """
+        One tile per agent. Fleets beyond the classic spawn points draw the
+        rest from the tiles nearest the docks (twice as many as needed, so
+        starts vary between seeds).
+        """
+        tiles = self.spawn_points[:count]
+        missing = count - len(tiles)
+        if missing > 0:
+            pool = self.spawn_pool[:2 * missing]
+            tiles += self.rng.sample(pool, missing)
+        return tiles
+
+    def _dock_occupants(self):
+        """Agents using each dock. Agents parked for the end of the shift (TERMINATED) do not."""
+        counts = [0] * len(self.docks)
+        for agent in self.agents:
+            if agent.state == "TERMINATED": continue
+            i = self.dock_index.get(agent.pos)
+            if i is not None:
+                counts[i] += 1
+        return counts
+
+    def _choose_dock(self, pos):
+        """
+        NEAREST-DOCK ROUTING: Closest dock (true step count from its distance
+        fields) that still has a free slot; if all are full, the closest one.
+        """
+        occupants = self._dock_occupants()
+        reachable = [(d.distance(pos), i) for i, d in enumerate(self.docks) if d.distance(pos) is not None]
+        if not reachable:
+            return self.docks[0]
+        with_room = [(dist, i) for dist, i in reachable if self.docks[i].has_room(occupants[i])]
+        return self.docks[min(with_room or reachable)[1]]
+
+    def _update_docks(self, ticks=1):
+        """
+        DOCK QUEUES: Agents leave the queue once they arrive (or were sent
+        elsewhere); then every dock records this tick (or 'ticks' identical
+        ticks) for its metrics.
+        """
+        agents_by_id = {a.id: a for a in self.agents}
+        occupants = self._dock_occupants()
+        for dock, count in zip(self.docks, occupants):
+            dock.queue = [
+                aid for aid in dock.queue
+                if agents_by_id[aid].target in dock.tiles and agents_by_id[aid].pos not in dock.tiles
+            ]
+            dock.record(count, ticks)
+
+    def quiet_ticks(self):
+        """
+        EVENT-DRIVEN: How many upcoming ticks are certain to change nothing but
+        countdowns (see _next_event). 0 = something happens on the next tick.
+        """
+        return self._next_event()[0]
+
+    def _next_event(self):
+        """
+        Looks ahead from the current state for the next EVENT: a move, a
+        search, a dispatch or a loader finishing. Until then, all that changes is:
+        - LOADING timers,
+        - the patience of agents waiting behind a blocker (Case C), or of agents
+          whose move keeps being refused by _resolve_moves (see reject_move),
+        - nothing at all for agents queueing behind a blocker with their target
+          or for a dock slot; they wait until someone else's event.
+        Returns (quiet ticks, vertex conflicts per quiet tick, edge conflicts
+        per quiet tick, ids whose patience counts down). Capped at EVENT_SKIP_LIMIT.
+        """
+        horizon = EVENT_SKIP_LIMIT
+        countdown = []
+        intents = {}
+        working = False
+        occupants = {agent.pos: agent for agent in self.agents if agent.pos[0] > -50}
+        for agent in self.agents:
+            if agent.pos[0] < -50: continue # Skip Phantoms
+            if agent.state == "TERMINATED":
+                if self.task_queue:
+                    return 0, 0, 0, [] # Would be woken up next tick
+                continue
+            working = True
+            if agent.task_complete or (agent.state == "IDLE" and agent.target is None):
+                return 0, 0, 0, [] # Dispatcher acts next tick
+            if agent.state == "LOADING":
+                horizon = min(horizon, agent.timer)
+                continue
+            kind, next_pos = agent.pending_move(occupants, self.shed_tiles)
+            if kind is None:
+                return 0, 0, 0, []
+            if kind == "patience":
+                horizon = min(horizon, agent.patience)
+                countdown.append(agent.id)
+            elif kind == "move":
+                intents[agent.id] = next_pos
+
+        if not working:
+            return 0, 0, 0, [] # Shift over
+        vertex_conflicts = edge_conflicts = 0
+        if intents:
+            # Quick exit: a step onto a free tile nobody else wants, without
+            # entering a sector or a dock, is always granted
+            wanted = list(intents.values())
+            for agent in self.agents:
+                next_pos = intents.get(agent.id)
+                if next_pos is None or next_pos in self.dock_index or wanted.count(next_pos) > 1:
+                    continue
+                next_sec = self.sector_map.get(next_pos)
+                if next_sec is None or next_sec == self.sector_map.get(agent.pos):
+                    return 0, 0, 0, []
+            # Nobody moves in a quiet stretch, so these are refused the same way every tick
+            movers, held, vertex_conflicts, edge_conflicts = self._resolve_moves(intents)
+            if movers:
+                return 0, 0, 0, []
+            for agent in self.agents:
+                if agent.id in intents and agent.id not in held:
+                    horizon = min(horizon, agent.patience)
+                    countdown.append(agent.id)
+        return horizon, vertex_conflicts, edge_conflicts, countdown
+
+    def _skip_quiet_ticks(self):
+        """
+        Jumps over quiet_ticks() ticks at once, leaving the env exactly as
+        that many plain step() calls would.
+        Returns (ticks skipped, vertex conflicts, edge conflicts) over the skip.
+        """
+        ticks, vertex_conflicts, edge_conflicts, countdown = self._next_event()
+        if not ticks:
+            return 0, 0, 0
+        for agent in self.agents:
+            if agent.pos[0] < -50 or agent.state == "TERMINATED": continue
+            if agent.state == "LOADING":
+                agent.timer -= ticks
+                agent.color = (0, 255, 0)
+                continue
+            # Everyone else spends the stretch in WAIT (see negotiate_move / reject_move)
+            while agent.path and agent.path[0] == agent.pos:
+                agent.path.pop(0)
+            if agent.id in countdown:
+                agent.patience -= ticks
+            agent.state = "WAIT"
+            agent.color = (255, 255, 0)
+        if self.track_traffic:
+            for _ in range(ticks):
+                self._update_traffic() # Same float ops as ticking, so replays match
+        self._update_docks(ticks)
+        return ticks, ticks * vertex_conflicts, ticks * edge_conflicts
+
+    def dock_metrics(self):
+        """Per-dock utilisation for the shift so far (see Dock.metrics)."""
+        return [dock.metrics() for dock in self.docks]
+
+    def _update_traffic(self):
+        """
+        TRAFFIC HEATMAP: Decay the old counts, add one for every working agent's
+        tile, and refresh the route costs the agents plan with (in place, since
+        every agent holds a reference to the same array).
+        """
+        self.traffic *= self.congestion_decay
+        for agent in self.agents:
+            if agent.pos[0] < -50 or agent.state == "TERMINATED": continue
+            self.traffic[agent.pos] += 1.0
+        np.multiply(self.traffic, self.congestion_weight, out=self.route_costs)
+
+    def _resolve_moves(self, intents):
+        """
+        SIMULTANEOUS MOVE RESOLUTION:
+        All intended moves are checked together against an occupancy index of
+        the start-of-tick positions. Ties are always broken by agent id, so the
+        outcome is deterministic and independent of the agent list order.
+        Returns: (set of agent ids allowed to move, ids held back by a full
+        dock, vertex conflicts, edge conflicts)
+        """
+        agents_by_id = {a.id: a for a in self.agents}
+
+        # Occupancy Index: Who stands on which tile right now (the Shed is exempt)
+        occupancy = {}
+        for a in self.agents:
+            if a.pos[0] < -50: continue # Skip Phantoms
+            if a.pos not in self.shed_tiles:
+                occupancy[a.pos] = a.id
+
+        # Only real moves compete for tiles ("stay" intents keep their own tile)
+        moves = {aid: pos for aid, pos in intents.items() if pos != agents_by_id[aid].pos}
+        blocked = set()
+        vertex_conflicts = 0
+        edge_conflicts = 0
+
+        # A. EDGE CONFLICTS: Two agents swapping tiles would pass through each other.
+        # Except a HANDOVER: an agent stepping off a dock tile (which never blocks)
+        # into the tile of the agent stepping onto it; that agent takes its slot.
+        handovers = {} # entering agent id -> id of the agent leaving the dock
+        for aid, next_pos in moves.items():
+            other = occupancy.get(next_pos)
+            if other is not None and moves.get(other) == agents_by_id[aid].pos:
+                if agents_by_id[aid].pos in self.shed_tiles:
+                    handovers[other] = aid
+                    continue
+                blocked.add(aid)
+                if aid < other:
+                    edge_conflicts += 1
+
+        # Steps B-E run again whenever an agent that won a tile or a sector is
+        # blocked further down: it drops out and the ones it beat get another go.
+        # (Each round drops at least one agent, so this ends.)
+        dropped = set(blocked)
+        dock_occupants = self._dock_occupants()
+        while True:
+            blocked = set(dropped)
+            held = set() # Waiting for a dock slot (queueing, not a conflict)
+            vertex_conflicts = 0
+            winners = set()
+
+            # B. DOCK CAPACITY: Agents entering a full dock wait at its entrance.
+            # Free slots go to the dock's queue in order, then to anyone else by id.
+            # (A slot only counts as free once its agent has actually left, or is
+            # handing it over this tick; agents parked for the end of the shift hold none.)
+            for i, dock in enumerate(self.docks):
+                if dock.capacity is None: continue
+                entering = [
+                    aid for aid in moves
+                    if aid not in blocked and self.dock_index.get(moves[aid]) == i
+                    and self.dock_index.get(agents_by_id[aid].pos) != i
+                ]
+                handing = {aid for aid in entering if aid in handovers and handovers[aid] not in blocked}
+                staying = dock_occupants[i] - len(handing)
+                entering.sort(key=lambda aid: (
+                    aid not in handing,
+                    dock.queue.index(aid) if aid in dock.queue else len(dock.queue),
+                    aid,
+                ))
+                for aid in entering[max(dock.capacity - staying, 0):]:
+                    blocked.add(aid)
+                    held.add(aid)
+
+            # C. SECTOR MANAGER: One agent per sector, a free sector goes to the lowest id
+            sector_claims = {}
+            for aid in sorted(moves):
+                if aid in blocked: continue
+                next_pos = moves[aid]
+                curr_sec = self.sector_map.get(agents_by_id[aid].pos)
+                next_sec = self.sector_map.get(next_pos)
+
+                if next_sec is not None and next_sec != curr_sec:
+                    if next_pos not in self.shed_tiles:
+                        owner = self.sector_occupancy.get(next_sec)
+                        if owner is not None and owner != aid:
+                            blocked.add(aid)
+                        elif sector_claims.setdefault(next_sec, aid) != aid:
+                            blocked.add(aid)
+            winners.update(sector_claims.values())
+
+            # D. VERTEX CONFLICTS: Several eligible agents claiming the same tile -> lowest id wins
+            claims = {}
+            for aid in sorted(moves):
+                if aid in blocked: continue
+                next_pos = moves[aid]
+                if next_pos in self.shed_tiles: continue
+                if next_pos in claims:
+                    blocked.add(aid)
+                    vertex_conflicts += 1
+                else:
+                    claims[next_pos] = aid
+            winners.update(claims.values())
+
+            # E. FOLLOWING: Stepping into an occupied tile only works if its occupant
+            # really leaves. Blocking one agent can block the one behind it, so we
+            # repeat until nothing changes.
+            changed = True
+            while changed:
+                changed = False
+                for aid in sorted(moves):
+                    if aid in blocked: continue
+                    occupant = occupancy.get(moves[aid])
+                    if occupant is not None and occupant != aid:
+                        if occupant not in moves or occupant in blocked:
+                            blocked.add(aid)
+                            vertex_conflicts += 1
+                            changed = True
+
+            lost = (winners & blocked) - held
+            if not lost:
+                break
+            dropped |= lost
+
+        return set(moves) - blocked, held, vertex_conflicts, edge_conflicts
+
+    def needs_dispatch(self):
+        """
+        True if the action passed to the next step() will actually assign a task,
+        i.e. some active agent is waiting at the Shed for work.
+        """
+        return bool(self.task_queue) and self._next_dispatched() is not None
+
+    def _next_dispatched(self):
+        """The agent the next step() hands a task to (None if nobody waits at a dock)."""
+        for agent in self.agents:
+            if agent.pos[0] < -50: continue # Skip Phantoms
+            if agent.pos not in self.shed_tiles: continue
+            is_unemployed = (agent.state == "IDLE" and agent.target is None)
+            if agent.task_complete or is_unemployed or agent.state == "TERMINATED":
+                return agent
+        return None
+
+    def get_state(self):
+        """
+        CHECKPOINT: Serializes the live shift (agents, task queue, sector owners
+        and the env's RNG) into a compact byte blob for set_state().
+        """
+        return pickle.dumps(self._snapshot(), protocol=pickle.HIGHEST_PROTOCOL)
+
+    def set_state(self, blob):
+        self._restore(pickle.loads(blob))
+
+    def clone(self):
+        """
+        FORK: A cheap copy of this env that shares the static map
+        (grid, allowed_moves, sector_map) but owns all the mutable state.
+        """
+        twin = copy.copy(self)
+        twin.rng = random.Random()
+        twin.agents = []
+        twin.window = None
+        twin.clock = None
+        twin.renderer = None
+        twin.exporter = None # The block belongs to the original
+        twin.render_mode = None
+        twin.plan_queue = [] if self.plan_queue is not None else None
+        twin.traffic = np.zeros_like(self.traffic)
+        twin.route_costs = np.zeros_like(self.route_costs)
+        twin.docks = [copy.copy(d) for d in self.docks]
+        twin._restore(self._snapshot())
+        return twin
+
+    def _snapshot(self):
+        return (
+            STATE_VERSION,
+            self.sim_config,
+            self.num_agents,
+            self.active_agents,
+            [a.get_state() for a in self.agents],
+            list(self.task_queue),
+            dict(self.sector_occupancy),
+            self.rng.getstate(),
+            self.traffic.copy(),
+            [d.get_state() for d in self.docks],
+        )
+
+    def _restore(self, state):
+        if state[0] != STATE_VERSION:
+            raise ValueError(f"State version {state[0]} does not match env version {STATE_VERSION}")
+        (version, sim_config, num_agents, active_agents, agent_states, task_queue,
+         sector_occupancy, rng_state, traffic, dock_states) = state
+        if sim_config != self.sim_config:
+            differ = sorted(k for k in sim_config.keys() | self.sim_config.keys()
+                            if sim_config.get(k) != self.sim_config.get(k))
+            raise ValueError(f"State comes from an env with other settings ({', '.join(differ)})")
+
+        self.active_agents = active_agents
+        # Agent() draws its patience from the RNG, so rebuild agents BEFORE restoring it
+        if len(self.agents) != len(agent_states):
+            self.agents = [Agent(i, (-100, -100), self.rng, self.planner) for i in range(len(agent_states))]
+        for agent, agent_state in zip(self.agents, agent_states):
+            agent.rng = self.rng
+            agent.plan_queue = self.plan_queue
+            agent.cell_costs = self.route_costs if self.congestion_routing else None
+            agent.set_state(agent_state)
+
+        self.task_queue = list(task_queue)
+        self.sector_occupancy = dict(sector_occupancy)
+        self.rng.setstate(rng_state)
+        self.traffic[:] = traffic
+        for dock, dock_state in zip(self.docks, dock_states):
+            dock.set_state(dock_state)
+        np.multiply(self.traffic, self.congestion_weight, out=self.route_costs)
 
     def _get_obs(self):
+        if self.obs_mode == "egocentric":
+            return self._get_egocentric_obs()
         # 1. Agent Positions (Absolute is fine, traffic awareness)
         agent_locs = np.array([a.pos for a in self.agents], dtype=np.float32).flatten()
         
@@ -245,83 +865,181 @@ class WarehouseEnv(gym.Env):
         # Combine: [Ag1_x, Ag1_y, ... , Task1_dx, Task1_dy, Task2_dx...]
         return np.concatenate([agent_locs, np.array(task_vectors, dtype=np.float32)])
 
+    def _build_obs_tables(self):
+        """
+        Static lookups for the egocentric obs, all indexed [x, y]:
+        obs_bucket  -> sector id, obs_buckets - 1 for the other walkable
+                       tiles (cross aisles, docks), -1 for walls
+        dock_return -> steps from the tile to the closest dock (-1 if none)
+        """
+        num_sectors = max(self.sector_map.values(), default=-1) + 1
+        self.obs_buckets = num_sectors + 1
+        self.obs_bucket = np.full((self.width, self.height), -1, dtype=np.int64)
+        for (x, y) in self.allowed_moves:
+            self.obs_bucket[x, y] = num_sectors
+        for (x, y), sector in self.sector_map.items():
+            self.obs_bucket[x, y] = sector
+        walkable = self.obs_bucket >= 0
+        self.bucket_tiles = np.maximum(np.bincount(self.obs_bucket[walkable], minlength=self.obs_buckets), 1)
+
+        self.dock_return = np.full((self.width, self.height), -1.0, dtype=np.float32)
+        for dock in self.docks:
+            for field in dock.fields.values():
+                for (x, y), d in field.items():
+                    if self.dock_return[x, y] < 0 or d < self.dock_return[x, y]:
+                        self.dock_return[x, y] = d
+
+    def _get_egocentric_obs(self):
+        """
+        FLEET-SIZE-INDEPENDENT EYES: the same number of floats for 4 or 400 agents.
+        1. Occupancy: share of the working agents in each sector (+ "other aisles")
+        2. Congestion: mean traffic heat per sector (+ "other aisles")
+        3. Top-3 tasks: true steps from the agent being dispatched (or the first
+           dock), steps back to the closest dock, sector already claimed, exists
+        4. Fleet: share of the working agents in each state, share of the shift left
+        Distances are scaled by (width + height); -1 = unreachable.
+        """
+        scale = float(self.width + self.height)
+        working = [a for a in self.agents if a.pos[0] > -50]
+        count = max(len(working), 1)
+
+        if working:
+            xs, ys = np.array([a.pos for a in working], dtype=np.int64).T
+            buckets = self.obs_bucket[xs, ys]
+            occupancy = np.bincount(buckets[buckets >= 0], minlength=self.obs_buckets) / count
+            states = np.bincount([EGO_STATES.index(a.state) for a in working], minlength=len(EGO_STATES)) / count
+        else:
+            occupancy = np.zeros(self.obs_buckets)
+            states = np.zeros(len(EGO_STATES))
+        walkable = self.obs_bucket >= 0
+        heat = np.bincount(self.obs_bucket[walkable], weights=self.traffic[walkable],
+                           minlength=self.obs_buckets) / self.bucket_tiles
+
+        origin_agent = self._next_dispatched()
+        origin = origin_agent.pos if origin_agent is not None else self.shed_pos
+        tasks = np.zeros((EGO_TOP_TASKS, EGO_TASK_FEATURES))
+        for i, t_pos in enumerate(self.task_queue[:EGO_TOP_TASKS]):
+            steps = distance_field(t_pos, self.allowed_moves).get(origin)
+            back = self.dock_return[t_pos]
+            tasks[i] = (
+                steps / scale if steps is not None else -1.0,
+                back / scale if back >= 0 else -1.0,
+                self.sector_occupancy.get(self.sector_map.get(t_pos)) is not None,
+                1.0,
+            )
+
+        return np.concatenate([
+            occupancy, heat, tasks.ravel(), states, [len(self.task_queue) / TASKS_PER_SHIFT],
+        ]).astype(np.float32)
+
     def render(self):
         if self.render_mode == "human":
-            if self.window is None:
-                pygame.init()
-                pygame.font.init() # Init font for debug text
-                self.window = pygame.display.set_mode((self.width * self.cell_size, self.height * self.cell_size))
-                pygame.display.set_caption("Warehouse MAS Debugger")
-                self.clock = pygame.time.Clock()
-                self.font = pygame.font.SysFont("Arial", 12) # Small font
+            self.draw_frame()
+            self.clock.tick(self.metadata["render_fps"])
+
+    def draw_frame(self):
+        """
+        Draws and shows ONE frame without waiting on the frame clock,
+        so a runner can pace rendering on its own (see async_runner.py).
+        """
+        if self.window is None:
+            pygame.init()
+            pygame.font.init() # Init font for debug text
+            self.window = pygame.display.set_mode((self.width * self.cell_size, self.height * self.cell_size))
+            pygame.display.set_caption("Warehouse MAS Debugger")
+            self.clock = pygame.time.Clock()
+            self.font = pygame.font.SysFont("Arial", 12) # Small font
+            if self.incremental_render:
+                self.renderer = IncrementalRenderer(self.window, self.grid, self.allowed_moves, self.font)
+        
+        scene = self._scene()
+        if self.renderer is not None:
+            self.renderer.draw(self.window, scene)
+            return
+
+        self.window.fill((30, 30, 30)) # Dark background
+        draw_grid(self.window, self.grid, self.allowed_moves)
+        for item in scene:
+            draw_primitive(self.window, self.font, item)
+        pygame.display.flip()
+
+    def _scene(self):
+        """
+        Everything drawn on top of the grid this frame, as visualizer primitives.
+        """
+        scene = []
+        half = self.cell_size // 2
+
+        # 1. Draw Targets (White Boxes)
+        pending_locations = set(self.task_queue)
+        for (tx, ty) in sorted(pending_locations):
+            cx = tx * self.cell_size + half
+            cy = ty * self.cell_size + half
+            scene.append(("rect", (255, 255, 255), (cx - 4, cy - 4, 10, 10), 0))
+
+        if self.task_queue:
+            nx, ny = self.task_queue[0]
+            cx = nx * self.cell_size + half
+            cy = ny * self.cell_size + half
+            scene.append(("circle", (0, 255, 255), (cx, cy), 6, 2))
+
+        # 2. Draw Agents & Debug Info
+        for agent in self.agents:
+            if agent.pos[0] < -50: continue # Skip Phantoms
             
-            self.window.fill((30, 30, 30)) # Dark background
-            draw_grid(self.window, self.grid, self.allowed_moves)
-
-            # 1. Draw Targets (White Boxes)
-            pending_locations = set(self.task_queue)
-            for (tx, ty) in pending_locations:
-                cx = tx * self.cell_size + self.cell_size // 2
-                cy = ty * self.cell_size + self.cell_size // 2
-                pygame.draw.rect(self.window, (255, 255, 255), (cx - 4, cy - 4, 10, 10))
-
-            if self.task_queue:
-                nx, ny = self.task_queue[0]
-                cx = nx * self.cell_size + self.cell_size // 2
-                cy = ny * self.cell_size + self.cell_size // 2
-                pygame.draw.circle(self.window, (0, 255, 255), (cx, cy), 6, width=2)
-
-            # 2. Draw Agents & Debug Info
-            for agent in self.agents:
-                if agent.pos[0] < -50: continue # Skip Phantoms
-                
-                # A. Draw Path Line (Trace)
-                if agent.path:
-                    points = [(p[0] * self.cell_size + self.cell_size//2, p[1] * self.cell_size + self.cell_size//2) for p in [agent.pos] + agent.path]
-                    if len(points) > 1:
-                        pygame.draw.lines(self.window, AGENT_COLORS[agent.id], False, points, 2)
-
-                # B. Draw Target Line (Direct line to goal)
-                if agent.target:
-                    start = (agent.pos[0] * self.cell_size + self.cell_size//2, agent.pos[1] * self.cell_size + self.cell_size//2)
-                    end = (agent.target[0] * self.cell_size + self.cell_size//2, agent.target[1] * self.cell_size + self.cell_size//2)
-                    # Thin dotted line color based on state
-                    line_col = (100, 100, 100) 
-                    pygame.draw.line(self.window, line_col, start, end, 1)
-
-                # C. Draw Agent Body
-                color = AGENT_COLORS[agent.id]
-                if agent.state == "WAIT": color = (255, 255, 0)
-                elif agent.state == "LOADING": color = (0, 255, 0)
-                elif agent.state == "TERMINATED": color = (100, 100, 100)
-                
-                cx = agent.pos[0] * self.cell_size + self.cell_size // 2
-                cy = agent.pos[1] * self.cell_size + self.cell_size // 2
-                pygame.draw.circle(self.window, color, (cx, cy), self.cell_size // 2 - 2)
+            # A. Draw Path Line (Trace)
+            if agent.path:
+                points = tuple((p[0] * self.cell_size + half, p[1] * self.cell_size + half) for p in [agent.pos] + agent.path)
+                if len(points) > 1:
+                    scene.append(("lines", AGENT_COLORS[agent.id % len(AGENT_COLORS)], points, 2))
+
+            # B. Draw Target Line (Direct line to goal)
+            if agent.target:
+                start = (agent.pos[0] * self.cell_size + half, agent.pos[1] * self.cell_size + half)
+                end = (agent.target[0] * self.cell_size + half, agent.target[1] * self.cell_size + half)
+                # Thin dotted line color based on state
+                line_col = (100, 100, 100) 
+                scene.append(("line", line_col, start, end, 1))
+
+            # Remaining picks of a multi-pick trip
+            for (px, py) in agent.pick_list:
+                center = (px * self.cell_size + half, py * self.cell_size + half)
+                scene.append(("circle", AGENT_COLORS[agent.id % len(AGENT_COLORS)], center, 5, 2))
+
+            # C. Draw Agent Body
+            color = AGENT_COLORS[agent.id % len(AGENT_COLORS)]
+            if agent.state == "WAIT": color = (255, 255, 0)
+            elif agent.state == "LOADING": color = (0, 255, 0)
+            elif agent.state == "TERMINATED": color = (100, 100, 100)
+            
+            cx = agent.pos[0] * self.cell_size + half
+            cy = agent.pos[1] * self.cell_size + half
+            scene.append(("circle", color, (cx, cy), self.cell_size // 2 - 2, 0))
+            
+            # --- DEBUG FEATURE 1: PATIENCE BAR ---
+            # Draw a small bar above agent head
+            if hasattr(agent, 'patience') and hasattr(agent, 'max_patience'):
+                bar_width = 20
+                bar_height = 4
+                fill_pct = agent.patience / agent.max_patience
+                bar_x = cx - bar_width // 2
+                bar_y = cy - 20
                 
-                # --- DEBUG FEATURE 1: PATIENCE BAR ---
-                # Draw a small bar above agent head
-                if hasattr(agent, 'patience') and hasattr(agent, 'max_patience'):
-                    bar_width = 20
-                    bar_height = 4
-                    fill_pct = agent.patience / agent.max_patience
-                    bar_x = cx - bar_width // 2
-                    bar_y = cy - 20
-                    
-                    # Background (Red)
-                    pygame.draw.rect(self.window, (255, 0, 0), (bar_x, bar_y, bar_width, bar_height))
-                    # Foreground (Green)
-                    pygame.draw.rect(self.window, (0, 255, 0), (bar_x, bar_y, bar_width * fill_pct, bar_height))
-
-                # --- DEBUG FEATURE 2: STATE ID ---
-                # Draw letter "W" (Wait), "L" (Load), "M" (Move)
-                state_char = agent.state[0]
-                text = self.font.render(state_char, True, (0, 0, 0))
-                self.window.blit(text, (cx - 3, cy - 8))
-
-            pygame.display.flip()
-            self.clock.tick(self.metadata["render_fps"])
+                # Background (Red)
+                scene.append(("rect", (255, 0, 0), (bar_x, bar_y, bar_width, bar_height), 0))
+                # Foreground (Green)
+                scene.append(("rect", (0, 255, 0), (bar_x, bar_y, bar_width * fill_pct, bar_height), 0))
+
+            # --- DEBUG FEATURE 2: STATE ID ---
+            # Draw letter "W" (Wait), "L" (Load), "M" (Move)
+            state_char = agent.state[0]
+            scene.append(("text", state_char, (0, 0, 0), (cx - 3, cy - 8)))
+
+        return scene
 
     def close(self):
+        if self.exporter is not None:
+            self.exporter.close()
+            self.exporter = None
         if self.window is not None:
             pygame.quit()
\ No newline at end of file
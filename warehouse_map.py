@@ -17,85 +17,89 @@ DOWN = (0, 1)
 LEFT = (-1, 0)
 RIGHT = (1, 0)
 
-def build_map():
-    grid = [[WALL for _ in range(WIDTH)] for _ in range(HEIGHT)]
+def build_map(width=WIDTH, height=HEIGHT):
+    """
+    Builds the warehouse grid and its one-way move rules. Other sizes follow
+    the same pattern (use a height of the form 4k + 2, e.g. 62).
+    """
+    grid = [[WALL for _ in range(width)] for _ in range(height)]
     allowed_moves = {}
 
     # Outer paths
-    for x in range(1, WIDTH-1, WIDTH-3):
-        for y in range(1, HEIGHT-1):
+    for x in range(1, width-1, width-3):
+        for y in range(1, height-1):
             grid[y][x] = BIDIR
             allowed_moves[(x, y)] = {UP, DOWN}
 
     # Outer paths Corners
     grid[1][1] = BIDIR               # Top-left
-    grid[1][WIDTH-2] = BIDIR         # Top-right
-    grid[HEIGHT-2][1] = BIDIR        # Bottom-left
-    grid[HEIGHT-2][WIDTH-2] = BIDIR  # Bottom-right
+    grid[1][width-2] = BIDIR         # Top-right
+    grid[height-2][1] = BIDIR        # Bottom-left
+    grid[height-2][width-2] = BIDIR  # Bottom-right
 
     allowed_moves[(1, 1)] = {RIGHT, DOWN}
-    allowed_moves[(WIDTH-2, 1)] = {LEFT, DOWN}
-    allowed_moves[(1, HEIGHT-2)] = {RIGHT, UP}
-    allowed_moves[(WIDTH-2, HEIGHT-2)] = {LEFT, UP}
+    allowed_moves[(width-2, 1)] = {LEFT, DOWN}
+    allowed_moves[(1, height-2)] = {RIGHT, UP}
+    allowed_moves[(width-2, height-2)] = {LEFT, UP}
 
     # Inner paths
     # Horizontal aisles
-    for y in range(2, HEIGHT, 4):
-        for x in range(2, WIDTH-2):
+    for y in range(2, height, 4):
+        for x in range(2, width-2):
             grid[y][x] = JUNCTION
             grid[y+1][x] = JUNCTION
             allowed_moves[(x, y)] = {LEFT, RIGHT, UP, DOWN}
             allowed_moves[(x, y+1)] = {LEFT, RIGHT, UP, DOWN}
 
     # Bottom path adjacent to wall
-    for x in range(2, WIDTH-2):
-        grid[HEIGHT-2][x] = JUNCTION
-        allowed_moves[(x, HEIGHT-2)] = {LEFT, RIGHT, UP}
+    for x in range(2, width-2):
+        grid[height-2][x] = JUNCTION
+        allowed_moves[(x, height-2)] = {LEFT, RIGHT, UP}
 
     # Side junctions
-    for y in range(2, HEIGHT-2, 4):
+    for y in range(2, height-2, 4):
         grid[y][1] = JUNCTION
         grid[y+1][1] = JUNCTION
-        grid[y][WIDTH-2] = JUNCTION
-        grid[y+1][WIDTH-2] = JUNCTION
+        grid[y][width-2] = JUNCTION
+        grid[y+1][width-2] = JUNCTION
         allowed_moves[(1, y)] = {UP, DOWN, RIGHT}
         allowed_moves[(1, y+1)] = {UP, DOWN, RIGHT}
-        allowed_moves[(WIDTH-2, y)] = {UP, DOWN, LEFT}
-        allowed_moves[(WIDTH-2, y+1)] = {UP, DOWN, LEFT}
+        allowed_moves[(width-2, y)] = {UP, DOWN, LEFT}
+        allowed_moves[(width-2, y+1)] = {UP, DOWN, LEFT}
 
     # Pallet access points
-    for y in range(0, HEIGHT-2, 4):
-        for x in range(2, WIDTH-2):
+    for y in range(0, height-2, 4):
+        for x in range(2, width-2):
             grid[y][x] = PALLET
             grid[y+1][x] = PALLET
             allowed_moves[(x, y)] = {UP}
             allowed_moves[(x, y+1)] = {DOWN}
 
     # Vertical aisles
-    for y in range(4, HEIGHT-2):
-            grid[y][WIDTH // 2 - 1] = JUNCTION
-            allowed_moves[(WIDTH // 2 - 1, y)] = {UP, DOWN, RIGHT}
-            grid[y][WIDTH // 2] = JUNCTION
-            allowed_moves[(WIDTH // 2, y)] = {UP, DOWN, LEFT}
+    for y in range(4, height-2):
+            grid[y][width // 2 - 1] = JUNCTION
+            allowed_moves[(width // 2 - 1, y)] = {UP, DOWN, RIGHT}
+            grid[y][width // 2] = JUNCTION
+            allowed_moves[(width // 2, y)] = {UP, DOWN, LEFT}
 
     # Middle Junctions
-    for y in range(2, HEIGHT-2, 4):
-        grid[y][WIDTH // 2 - 1] = JUNCTION
-        grid[y+1][WIDTH // 2 - 1] = JUNCTION
-        grid[y][WIDTH // 2] = JUNCTION
-        grid[y+1][WIDTH // 2] = JUNCTION
-        allowed_moves[(WIDTH // 2 - 1, y)] = {UP, DOWN, RIGHT, LEFT}
-        allowed_moves[(WIDTH // 2 - 1, y+1)] = {UP, DOWN, RIGHT, LEFT}
-        allowed_moves[(WIDTH // 2, y)] = {UP, DOWN, RIGHT, LEFT}
-        allowed_moves[(WIDTH // 2, y+1)] = {UP, DOWN, RIGHT, LEFT}
+    for y in range(2, height-2, 4):
+        grid[y][width // 2 - 1] = JUNCTION
+        grid[y+1][width // 2 - 1] = JUNCTION
+        grid[y][width // 2] = JUNCTION
+        grid[y+1][width // 2] = JUNCTION
+        allowed_moves[(width // 2 - 1, y)] = {UP, DOWN, RIGHT, LEFT}
+        allowed_moves[(width // 2 - 1, y+1)] = {UP, DOWN, RIGHT, LEFT}
+        allowed_moves[(width // 2, y)] = {UP, DOWN, RIGHT, LEFT}
+        allowed_moves[(width // 2, y+1)] = {UP, DOWN, RIGHT, LEFT}
 
     # Loading shed
-    grid[HEIGHT-2][WIDTH // 2 - 1], grid[HEIGHT-2][WIDTH // 2] = SHED, SHED
-    allowed_moves[(WIDTH // 2 - 1, HEIGHT-2)] = {LEFT, RIGHT, UP}
-    allowed_moves[(WIDTH // 2, HEIGHT-2)] = {LEFT, RIGHT, UP}
+    grid[height-2][width // 2 - 1], grid[height-2][width // 2] = SHED, SHED
+    allowed_moves[(width // 2 - 1, height-2)] = {LEFT, RIGHT, UP}
+    allowed_moves[(width // 2, height-2)] = {LEFT, RIGHT, UP}
 
     # Minor adjustment
-    for x in range(0, WIDTH):
+    for x in range(0, width):
         grid[0][x] = WALL
         allowed_moves.pop((x, 0), None)
 
@@ -116,19 +120,17 @@ def build_sectors(grid):
     # Format: (y_start, y_end, x_left_end, x_right_start)
     # Note: Python ranges are exclusive at the end, so we add +1 to the end index.
     
+    # Row 1 (y=2 to 3): Left 2-13, Right 14-End (meets in middle)
+    # Row 2+ (y=6 to 7, ...): Left 2-12, Right 15-End (Gap in middle)
+    # (Column numbers are for the default 28-wide map; they scale with its width.)
+    mid = cols // 2
     definitions = [
-        # Row 1 (y=2 to 3): Left 2-13, Right 14-End
-        {"y_range": (2, 4), "left_x": (2, 14), "right_x": (14, cols-2)},
-        
-        # Row 2 (y=6 to 7): Left 2-12, Right 15-End (Gap in middle)
-        {"y_range": (6, 8), "left_x": (2, 13), "right_x": (15, cols-2)},
-        
-        # Row 3 (y=10 to 11): Left 2-12, Right 15-End (Gap in middle)
-        {"y_range": (10, 12), "left_x": (2, 13), "right_x": (15, cols-2)},
-        
-        # Row 4 (y=14 to 15): Left 2-12, Right 15-End (Gap in middle)
-        {"y_range": (14, 16), "left_x": (2, 13), "right_x": (15, cols-2)},
+        {"y_range": (2, 4), "left_x": (2, mid), "right_x": (mid, cols-2)},
     ]
+    for y in range(6, rows-2, 4):
+        definitions.append(
+            {"y_range": (y, y+2), "left_x": (2, mid-1), "right_x": (mid+1, cols-2)}
+        )
 
     for definition in definitions:
         y_start, y_end = definition["y_range"]